@@ -0,0 +1,198 @@
+import re
+import time
+import threading
+import concurrent.futures
+import metrics
+
+# "All regions" lookups: the NSW registry and the QLD archive are searched at
+# the same time on a shared thread pool, so a combined search costs the slower
+# source rather than the sum of both. Each source has its own deadline; one
+# that fails or runs out of time is reported on its own, with whatever it had
+# found by then (QLD hits stream in newest first; NSW falls back to its last
+# cached result), and never holds up the other. Every hit is normalized into
+# a RECORD_HEADERS row so the two can be shown and exported together.
+SOURCES = ('NSW', 'QLD')
+
+# Seconds each source may take; NSW allows for its HTTP timeout plus a
+# browser fallback, QLD for a cold index refresh
+TIMEOUTS = {'NSW': 25, 'QLD': 20}
+
+# Searches running at once across every session; a source that timed out
+# keeps its worker until it finishes
+WORKERS = 8
+
+RECORD_HEADERS = ['Jurisdiction', 'Court', 'Date', 'Time', 'Reference', 'Detail']
+
+# Result status: 'ok', 'partial' (timed out with some results), 'timeout' or 'error'
+STATUSES = ('ok', 'partial', 'timeout', 'error')
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(WORKERS, thread_name_prefix='all-regions')
+        return _executor
+
+
+def _iso(date):
+    # NSW's 20/05/2025 -> 2025-05-20, so both sources sort the same way
+    m = re.fullmatch(r'(\d{1,2})/(\d{1,2})/(\d{4})', date.strip())
+    return f"{m[3]}-{int(m[2]):02d}-{int(m[1]):02d}" if m else date
+
+
+def nsw_records(rows):
+    """NSW result rows (nsw_scraper.HEADERS order) -> records"""
+    for row in rows:
+        date, time_, case_number, title, _, court, event, _, location = row[:9]
+        detail = ' · '.join(part for part in (title, event) if part)
+        yield ['NSW', location or court, _iso(date), time_, case_number, detail]
+
+
+def qld_records(hits, rows=None):
+    """QLD (court, file, page) hits -> one record per list, with its listing
+    rows ({(court, file): [row]}, as search.find_listings groups them) as detail"""
+    grouped = {}
+    for court, file, page in hits:
+        grouped.setdefault((court, file), []).append(page)
+    rows = rows or {}
+    for (court, file), pages in grouped.items():
+        listed = rows.get((court, file), [])
+        times = sorted({row['time'] for row in listed if row['time']})
+        detail = '; '.join(dict.fromkeys(row['party'] for row in listed))
+        yield ['QLD', court, file[:-len('.pdf')], ', '.join(times),
+               f"p. {', '.join(map(str, sorted(pages)))}", detail]
+
+
+def _nsw(term, found, backend=None, driver_pool=None, refresh=False, **_):
+    import nsw_cache
+    import nsw_scraper
+    rows, fetched, fresh = nsw_cache.search(term, backend or nsw_scraper.BACKEND, driver_pool, refresh=refresh)
+    if rows is None:
+        return [], "no result table found"
+    note = f"fetched {nsw_cache.age(fetched)}" if fresh else \
+        f"registry unreachable; cached result from {nsw_cache.age(fetched)}"
+    return list(nsw_records(rows)), note
+
+
+def _nsw_partial(term, found, **_):
+    # Timed out: the last cached result, however old
+    import contextlib
+    import nsw_cache
+    with contextlib.closing(nsw_cache.connect()) as conn:
+        cached = nsw_cache.get(conn, term)
+    if not cached:
+        return [], None
+    return list(nsw_records(cached[0])), f"cached result from {nsw_cache.age(cached[1])}"
+
+
+def _qld(term, found, qld=None, root='data', prepare=None, timeout=None, **_):
+    if qld is None:
+        import search as qld
+    if prepare:
+        prepare()
+    errors = []
+    # Hits are handed over one by one, so a timeout still shows the latest lists
+    for hit in qld.iter_hits(term, root, timeout=timeout, errors=errors):
+        found.append(hit)
+    rows = {}
+    if found:
+        for row in qld.find_listings(term, root):
+            rows.setdefault((row['court'], f"{row['date']}.pdf"), []).append(row)
+    note = f"{len(found)} page(s)" + (f"; {len(errors)} list(s) unreadable" if errors else "")
+    return list(qld_records(found, rows)), note
+
+
+def _qld_partial(term, found, **_):
+    hits = list(found)
+    return list(qld_records(hits)), f"{len(hits)} page(s) found before it stopped"
+
+
+_RUNNERS = {'NSW': (_nsw, _nsw_partial), 'QLD': (_qld, _qld_partial)}
+
+
+def search_all(term, sources=SOURCES, timeouts=None, **options):
+    """Search every source at once; yield a result dict per source as each
+    finishes, fails or runs out of time.
+
+    A result has source, status (see STATUSES), records (RECORD_HEADERS
+    rows), note (a short human-readable remark or None) and seconds. options
+    go to the sources: backend, driver_pool and refresh for NSW; qld (search
+    or a search_api.Client), root and prepare (called first, on the worker)
+    for QLD.
+    """
+    timeouts = dict(TIMEOUTS, **(timeouts or {}))
+    started = time.monotonic()
+    found = {source: [] for source in sources}
+    pending = {}
+    for source in sources:
+        run = _RUNNERS[source][0]
+        future = _pool().submit(run, term, found[source], timeout=timeouts[source], **options)
+        pending[future] = source
+
+    def result(source, status, records, note):
+        seconds = time.monotonic() - started
+        metrics.observe('all_regions_seconds', seconds, source=source, status=status)
+        return {'source': source, 'status': status, 'records': records, 'note': note, 'seconds': seconds}
+
+    while pending:
+        now = time.monotonic()
+        wait = min(started + timeouts[source] for source in pending.values()) - now
+        done, _ = concurrent.futures.wait(pending, max(wait, 0), concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            source = pending.pop(future)
+            try:
+                records, note = future.result()
+            except Exception as e:
+                records, note = _partial(source, term, found[source], **options)
+                yield result(source, 'partial' if records else 'error', records, f"{e}" + (f"; {note}" if note else ""))
+            else:
+                yield result(source, 'ok', records, note)
+        now = time.monotonic()
+        for future, source in list(pending.items()):
+            if now >= started + timeouts[source]:
+                # The worker runs on in the background; its answer is dropped
+                del pending[future]
+                future.cancel()
+                records, note = _partial(source, term, found[source], **options)
+                yield result(source, 'partial' if records else 'timeout', records,
+                             f"no answer within {timeouts[source]}s" + (f"; {note}" if note else ""))
+
+
+def _partial(source, term, found, **options):
+    try:
+        return _RUNNERS[source][1](term, found, **options)
+    except Exception as e:
+        print(f"⚠️ No partial {source} results for '{term}': {e}")
+        return [], None
+
+
+def sort_records(records):
+    """Newest first, then jurisdiction, court and time"""
+    return sorted(records, key=lambda r: (r[2], r[0], r[1], r[3]), reverse=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    from tabulate import tabulate
+    parser = argparse.ArgumentParser(description="Search the NSW registry and the QLD archive at once")
+    parser.add_argument('term')
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--source', action='append', choices=SOURCES, help="only this source (repeatable)")
+    parser.add_argument('--backend', help="NSW backend (default: NSW_BACKEND or selenium)")
+    for source in SOURCES:
+        parser.add_argument(f'--{source.lower()}-timeout', type=float, default=TIMEOUTS[source],
+                            help=f"seconds to wait for {source}")
+    args = parser.parse_args()
+
+    records = []
+    timeouts = {source: getattr(args, f'{source.lower()}_timeout') for source in SOURCES}
+    for r in search_all(args.term, args.source or SOURCES, timeouts, backend=args.backend, root=args.root):
+        icon = {'ok': '✅', 'partial': '🟠', 'timeout': '⏱️', 'error': '❌'}[r['status']]
+        print(f"{icon} {r['source']}: {len(r['records'])} result(s) in {r['seconds']:.2f}s"
+              + (f" ({r['note']})" if r['note'] else ""))
+        records.extend(r['records'])
+    print(tabulate(sort_records(records), headers=RECORD_HEADERS))
@@ -1,38 +1,52 @@
 import streamlit as st
 import os
-import PyPDF2
+import search
+import metrics
+import resources
 
 st.set_page_config(page_title="Court Appearance Search", layout="wide")
+metrics.serve()  # Prometheus text on METRICS_PORT, when set
+resources.warm()  # index refresh starts while the user is still typing
 
 st.title("🔍 QLD Court Attendance Search")
 st.markdown("Enter a name to search across all daily law list PDFs.")
 
 query = st.text_input("Search for a name", placeholder="e.g. John Smith")
 
-def search_name(name, root='data'):
-    hits = []
-    for court in os.listdir(root):
-        court_path = os.path.join(root, court)
-        if not os.path.isdir(court_path):
-            continue
-        for file in os.listdir(court_path):
-            if file.endswith('.pdf'):
-                try:
-                    with open(os.path.join(court_path, file), 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        text = " ".join(page.extract_text() or "" for page in reader.pages)
-                        if name.lower() in text.lower():
-                            hits.append((court, file))
-                except Exception as e:
-                    st.error(f"Error reading {file}: {e}")
-    return hits
+latest_only = st.checkbox("Latest appearance only")
+
+# Narrowing the search to some courts or dates skips the rest of the archive
+# Answered by the search service when SEARCH_API_URL is set
+qld = resources.qld_search()
+regions = resources.regions()
+with st.expander("Filter by region, court or date"):
+    chosen_regions = st.multiselect("Regions", list(regions))
+    chosen_courts = st.multiselect("Courts", sorted(c for courts in regions.values() for c in courts))
+    since = st.date_input("From", value=None)
+    until = st.date_input("To", value=None)
+scope = dict(
+    courts=search.select_courts(chosen_courts, chosen_regions),
+    since=since.isoformat() if since else None,
+    until=until.isoformat() if until else None,
+)
 
 if query:
-    with st.spinner("Searching..."):
-        results = search_name(query)
+    # Results stream in newest first, so the first hits show up straight away
+    summary = st.empty()
+    summary.info("Searching...")
+    # Opt-in profiling of slow queries (METRICS_PROFILE)
+    with metrics.profiled('app-search'):
+        errors = []
+        results = []
+        for court, file, _ in qld.iter_hits(query, limit=1 if latest_only else None, errors=errors, **scope):
+            if (court, file) not in results[-1:]:
+                results.append((court, file))
+                st.markdown(f"- **{court}**: `{file}`")
+        for file_path, e in errors:
+            st.error(f"Error reading {os.path.basename(file_path)}: {e}")
     if results:
-        st.success(f"Found {len(results)} result(s) for **{query}**:")
-        for court, file in sorted(results):
-            st.markdown(f"- **{court}**: `{file}`")
+        summary.success(f"Found {len(results)} result(s) for **{query}**:")
     else:
-        st.warning(f"No results found for **{query}**.")
+        summary.warning(f"No results found for **{query}**.")
+    resources.refresh_index()
+    metrics.flush()
@@ -0,0 +1,266 @@
+import io
+import os
+import json
+import zlib
+import hashlib
+import struct
+import zipfile
+import threading
+from datetime import date
+
+# Closed months are packed into one zip per court, data/<court>/<YYYY-MM>.zip,
+# holding each distinct PDF of the month once, named by its sha256, and its
+# extracted raw page text (JSON; the normalized text is rebuilt on read).
+# Days whose list didn't change share one pair of members. PDFs are already
+# compressed and are stored as they are; the text is deflated. A sidecar
+# <YYYY-MM>.idx.json records where every day's members start, so one day's
+# PDF or text is read with a single seek (and inflate), without unpacking or
+# parsing the zip's central directory. A packed list keeps its court/file
+# name, size and mtime, so the manifest, the search index and every
+# (court, file) API see no difference; data/<court>/<date>.pdf just resolves
+# into the archive.
+ARCHIVE_EXT = '.zip'
+INDEX_EXT = '.idx.json'
+
+# Local file header: signature ... file name length, extra field length
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+_lock = threading.Lock()
+# index path -> (mtime_ns, index)
+_indexes = {}
+
+
+def month_of(file):
+    """'2025-05-12.pdf' -> '2025-05'"""
+    return file[:7]
+
+
+def archive_path(root, court, month):
+    return os.path.join(root, court, month + ARCHIVE_EXT)
+
+
+def index_path(root, court, month):
+    return os.path.join(root, court, month + INDEX_EXT)
+
+
+def _split(pdf_path):
+    # data/<court>/<date>.pdf -> (root, court, file)
+    court_dir, file = os.path.split(pdf_path)
+    root, court = os.path.split(court_dir)
+    return root, court, file
+
+
+def read_index(root, court, month):
+    """The offset index of one month's archive, or None if it isn't packed"""
+    path = index_path(root, court, month)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        cached = _indexes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, encoding='utf-8') as f:
+        index = json.load(f)
+    # A zip replaced after its index was read (or a half-finished pack)
+    # invalidates the offsets; rebuild them from the zip itself
+    zpath = archive_path(root, court, month)
+    if os.path.getsize(zpath) != index['archive_bytes']:
+        index = _build_index(zpath, index['files'])
+    with _lock:
+        _indexes[path] = (mtime, index)
+    return index
+
+
+def packed_files(root, court):
+    """Names of the lists packed into court's archives"""
+    court_dir = os.path.join(root, court)
+    for name in sorted(os.listdir(court_dir)):
+        if name.endswith(INDEX_EXT):
+            index = read_index(root, court, name[:-len(INDEX_EXT)])
+            if index:
+                yield from index['files']
+
+
+def locate(pdf_path):
+    """The index record of a packed list, or None"""
+    root, court, file = _split(pdf_path)
+    index = read_index(root, court, month_of(file))
+    return index['files'].get(file) if index else None
+
+
+def _read(zpath, member):
+    offset, size, method = member
+    with open(zpath, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size)
+    if method == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -15)
+    return data
+
+
+def stat(pdf_path):
+    """(size, mtime_ns) of a list, loose or packed"""
+    try:
+        st = os.stat(pdf_path)
+        return st.st_size, st.st_mtime_ns
+    except FileNotFoundError:
+        record = locate(pdf_path)
+        if record is None:
+            raise
+        return record['bytes'], record['mtime']
+
+
+def exists(pdf_path):
+    return os.path.exists(pdf_path) or locate(pdf_path) is not None
+
+
+def open_pdf(pdf_path):
+    """A binary file object for a list, loose or packed"""
+    try:
+        return open(pdf_path, 'rb')
+    except FileNotFoundError:
+        record = locate(pdf_path)
+        if record is None:
+            raise
+    root, court, file = _split(pdf_path)
+    return io.BytesIO(_read(archive_path(root, court, month_of(file)), record['pdf']))
+
+
+def load_entry(pdf_path):
+    """The text cache entry stored with a packed list, or None"""
+    record = locate(pdf_path)
+    if record is None:
+        return None
+    from text_cache import normalize
+    root, court, file = _split(pdf_path)
+    entry = json.loads(_read(archive_path(root, court, month_of(file)), record['text']))
+    entry['pages'] = [normalize(text) for text in entry['raw']]
+    return entry
+
+
+def load_page(pdf_path, page, raw=False):
+    """Normalized (or raw) text of one 1-based page of a loose or packed list"""
+    from text_cache import load_entry as cached_entry
+    entry = cached_entry(pdf_path)
+    return (entry['raw'] if raw else entry['pages'])[page - 1]
+
+
+def _build_index(zpath, files):
+    # Offsets of each member's data, read from the local headers
+    with zipfile.ZipFile(zpath) as z, open(zpath, 'rb') as f:
+        located = {}
+        for info in z.infolist():
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            start = info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1]
+            located[info.filename] = [start, info.compress_size, info.compress_type]
+    index = {}
+    for file, record in files.items():
+        # Members are named by content; archives packed before that by day
+        name = record['sha256'] if record['sha256'] + '.pdf' in located else file[:-len('.pdf')]
+        index[file] = dict(record, pdf=located[name + '.pdf'], text=located[name + '.json'])
+    return {'archive_bytes': os.path.getsize(zpath), 'files': index}
+
+
+def _write_json(path, obj):
+    with open(path + '.part', 'w', encoding='utf-8') as f:
+        json.dump(obj, f, sort_keys=True)
+    os.replace(path + '.part', path)
+
+
+def pack(root, court, month, remove=True):
+    """Pack court's loose lists from month (YYYY-MM) into its archive.
+
+    Lists already in the archive are kept; each new one is validated and its
+    text extracted (through the text cache) first, and any that fail stay
+    loose. With remove, packed PDFs are deleted along with store objects no
+    other file links to. Returns (packed file names, failures).
+    """
+    import manifest
+    from text_cache import load_entry as cached_entry
+    court_dir = os.path.join(root, court)
+    loose = sorted(f for f in os.listdir(court_dir) if f.endswith('.pdf') and month_of(f) == month)
+    old = read_index(root, court, month)
+    members = {}
+    if old:
+        zpath = archive_path(root, court, month)
+        for file, record in old['files'].items():
+            members[file] = (record, _read(zpath, record['pdf']), _read(zpath, record['text']))
+    packed, failures = [], []
+    for file in loose:
+        path = os.path.join(court_dir, file)
+        try:
+            pages = manifest.validate(path)
+            entry = cached_entry(path)
+            with open(path, 'rb') as f:
+                pdf = f.read()
+        except Exception as e:
+            failures.append((path, e))
+            continue
+        st = os.stat(path)
+        record = {'bytes': st.st_size, 'mtime': st.st_mtime_ns, 'pages': pages,
+                  'sha256': hashlib.sha256(pdf).hexdigest()}
+        text = json.dumps({k: entry[k] for k in ('raw', 'backends', 'seconds', 'order') if k in entry}).encode('utf-8')
+        members[file] = (record, pdf, text)
+        packed.append(file)
+    if not packed:
+        return [], failures
+
+    zpath = archive_path(root, court, month)
+    with zipfile.ZipFile(zpath + '.part', 'w') as z:
+        written = set()
+        for file in sorted(members):
+            record, pdf, text = members[file]
+            if record['sha256'] in written:
+                continue
+            written.add(record['sha256'])
+            z.writestr(record['sha256'] + '.pdf', pdf, compress_type=zipfile.ZIP_STORED)
+            z.writestr(record['sha256'] + '.json', text, compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(zpath + '.part', zpath)
+    _write_json(index_path(root, court, month),
+                _build_index(zpath, {file: record for file, (record, _, _) in members.items()}))
+
+    if remove:
+        for file in packed:
+            path = os.path.join(court_dir, file)
+            os.remove(path)
+            obj = os.path.join(root, '.objects', members[file][0]['sha256'][:2], members[file][0]['sha256'] + '.pdf')
+            if os.path.exists(obj) and os.stat(obj).st_nlink == 1:
+                os.remove(obj)
+    return packed, failures
+
+
+def compact(root='data', courts=None, before=None, remove=True):
+    """Pack every closed month (earlier than before, YYYY-MM, default this
+    month) that still has loose lists. Returns {(court, month): (packed, failures)}."""
+    before = before or date.today().strftime('%Y-%m')
+    results = {}
+    for court in sorted(courts or os.listdir(root)):
+        court_dir = os.path.join(root, court)
+        if court.startswith('.') or not os.path.isdir(court_dir):
+            continue
+        months = sorted({month_of(f) for f in os.listdir(court_dir) if f.endswith('.pdf')})
+        for month in months:
+            if month < before:
+                results[(court, month)] = pack(root, court, month, remove)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Pack closed months of law lists into one archive per court and month")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--court', action='append', help="only this court folder (repeatable)")
+    parser.add_argument('--before', metavar='YYYY-MM', help="pack months before this one (default: the current month)")
+    parser.add_argument('--keep', action='store_true', help="leave the loose PDFs in place after packing")
+    args = parser.parse_args()
+
+    results = compact(args.root, args.court, args.before, remove=not args.keep)
+    files = sum(len(packed) for packed, _ in results.values())
+    archives = sum(1 for packed, _ in results.values() if packed)
+    for (court, month), (_, failures) in sorted(results.items()):
+        for path, e in failures:
+            print(f"⚠️ Left {path} loose: {e}")
+    print(f"📦 Packed {files} list(s) into {archives} archive(s)")
@@ -0,0 +1,489 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+import subprocess
+import urllib.parse
+from datetime import date, timedelta
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import PyPDF2
+import metrics
+
+# Benchmarks run against a synthetic archive shaped like the real one: every
+# court in urls.json, one list per weekday, each built from that court's
+# sample list in data/ (so page counts and name density are the real ones)
+# with a little day-to-day variation in length.
+SAMPLE_DATE = '2025-05-12'
+QUERIES = ['smith', 'zzqx nobody']
+
+# Streamlit apps timed by bench_startup -> widget values to set before the
+# search box (None: no search, e.g. NSW would go to the network)
+APPS = {
+    'app.py': [],
+    'streamlit-qld.py': [],
+    'streamlit-search.py': [('radio', 'QLD')],
+    'streamlit-nsw.py': None,
+}
+HEAVY_MODULES = ('selenium.webdriver', 'webdriver_manager', 'bs4', 'openpyxl', 'PyPDF2', 'pyarrow')
+
+# Runs in a fresh interpreter so every import is cold
+_APP_RUN = '''
+import sys, json, time, threading
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+framework = time.perf_counter() - start
+path, steps, query, reruns = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3], int(sys.argv[4])
+at = AppTest.from_file(path, default_timeout=600)
+
+def timed():
+    start = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    return time.perf_counter() - start
+
+out = {'framework_seconds': framework, 'cold_seconds': timed()}
+# Background warm-up (resources.warm) finishes before reruns are timed
+start = time.perf_counter()
+for thread in threading.enumerate():
+    if thread.name.startswith('warm-'):
+        thread.join()
+out['warm_seconds'] = time.perf_counter() - start
+out['rerun'] = [timed() for _ in range(reruns)]
+if steps is not None:
+    for kind, value in steps:
+        getattr(at, kind)[0].set_value(value)
+        timed()
+    at.text_input[0].input(query)
+    out['search_seconds'] = timed()
+    out['search_rerun'] = [timed() for _ in range(reruns)]
+out['modules'] = [m for m in json.loads(sys.argv[5]) if m in sys.modules]
+print(json.dumps(out))
+'''
+
+
+def make_corpus(out_root, days=5, samples_root='data', urls_path='urls.json', start='2025-01-06', seed=0):
+    """Write out_root/<court>/<date>.pdf for days weekdays from start.
+
+    Returns {'courts', 'files', 'pages', 'bytes', 'dates'}.
+    """
+    rng = random.Random(seed)
+    with open(urls_path) as f:
+        courts = sorted(json.load(f))
+    samples = {}
+    for court in courts:
+        path = os.path.join(samples_root, court, f"{SAMPLE_DATE}.pdf")
+        if os.path.exists(path):
+            samples[court] = PyPDF2.PdfReader(path).pages
+    if not samples:
+        raise SystemExit(f"No {SAMPLE_DATE}.pdf samples found under {samples_root}")
+
+    dates = []
+    day = date.fromisoformat(start)
+    while len(dates) < days:
+        if day.weekday() < 5:
+            dates.append(day.isoformat())
+        day += timedelta(days=1)
+
+    stats = {'courts': len(courts), 'files': 0, 'pages': 0, 'bytes': 0, 'dates': [dates[0], dates[-1]]}
+    for court in courts:
+        pages = samples.get(court) or samples[rng.choice(sorted(samples))]
+        os.makedirs(os.path.join(out_root, court), exist_ok=True)
+        for d in dates:
+            order = list(range(len(pages)))
+            # Busier and quieter days: repeat or drop a page now and then
+            if rng.random() < 0.2:
+                order.append(rng.choice(order))
+            elif len(order) > 1 and rng.random() < 0.1:
+                order.pop(rng.randrange(len(order)))
+            writer = PyPDF2.PdfWriter()
+            for i in order:
+                writer.add_page(pages[i])
+            # Distinct bytes per file, so the content-hash cache can't dedupe them
+            writer.add_metadata({'/Title': f"{court} {d}"})
+            path = os.path.join(out_root, court, f"{d}.pdf")
+            with open(path, 'wb') as f:
+                writer.write(f)
+            stats['files'] += 1
+            stats['pages'] += len(order)
+            stats['bytes'] += os.path.getsize(path)
+    return stats
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _timings(values):
+    return {
+        'n': len(values),
+        'p50_seconds': round(_percentile(values, 0.5), 6),
+        'p95_seconds': round(_percentile(values, 0.95), 6),
+        'max_seconds': round(max(values), 6),
+    }
+
+
+def _pages_by_backend():
+    prefix = 'pages_extracted_total{backend='
+    return {key[len(prefix):-1]: n for key, n in metrics.REGISTRY.summary().items() if key.startswith(prefix)}
+
+
+def bench_extract(corpus_root, workers):
+    """Cold text extraction of the whole corpus into the (empty) text cache"""
+    import text_cache
+    paths = [os.path.join(corpus_root, c, f) for c, f in text_cache.iter_pdfs(corpus_root)]
+    before = _pages_by_backend()
+    start = time.perf_counter()
+    failed = text_cache.load_many(paths, workers=workers, errors=[])
+    seconds = time.perf_counter() - start
+    backends = {name: n - before.get(name, 0) for name, n in _pages_by_backend().items()}
+    pages = sum(backends.values())
+    return {
+        'workers': workers,
+        'files': len(paths) - len(failed),
+        'pages': pages,
+        'seconds': round(seconds, 4),
+        'files_per_s': round((len(paths) - len(failed)) / seconds, 2),
+        'pages_per_s': round(pages / seconds, 2),
+        'backends': backends,
+    }
+
+
+def bench_search(corpus_root, repeats):
+    """Scan search before the index exists, the index build, then indexed queries"""
+    import search
+    import search_index
+    import text_cache
+    import text_store
+    results = {}
+
+    # The index does not exist yet, so this walks the (warm) text cache
+    for query in QUERIES:
+        start = time.perf_counter()
+        hits = sum(1 for _ in search.iter_hits(query, corpus_root))
+        results[f"scan_{query.replace(' ', '_')}"] = {'seconds': round(time.perf_counter() - start, 4), 'hits': hits}
+
+    start = time.perf_counter()
+    indexed = search.update_index(corpus_root)
+    results['index_build'] = {'files': indexed, 'seconds': round(time.perf_counter() - start, 4)}
+
+    # The same scans over the memory-mapped text store update_index just
+    # built, with the peak Python allocation of each scan path
+    with text_store.TextStore(text_store.store_dir_for(corpus_root)) as store:
+        for query in QUERIES:
+            start = time.perf_counter()
+            hits = sum(1 for _ in store.find(query))
+            results[f"store_scan_{query.replace(' ', '_')}"] = {'seconds': round(time.perf_counter() - start, 4), 'hits': hits}
+        files = list(text_cache.iter_pdfs(corpus_root))
+        for label, scan in (('scan', lambda: sum(1 for c, f in files for text in search.load_pages(os.path.join(corpus_root, c, f))
+                                                  if QUERIES[1] in text)),
+                            ('store_scan', lambda: sum(1 for _ in store.find(QUERIES[1])))):
+            tracemalloc.start()
+            scan()
+            results[f"{label}_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    # A real party from the corpus, so one query is a precise full-name hit
+    with contextlib.closing(search_index.connect()) as conn:
+        parties = sorted(r[0] for r in conn.execute("SELECT DISTINCT party FROM listings"))
+    queries = QUERIES + ([random.Random(0).choice(parties)] if parties else [])
+
+    for query in queries:
+        label = 'party' if query not in QUERIES else query.replace(' ', '_')
+        first = None
+        warm = []
+        for i in range(repeats + 1):
+            start = time.perf_counter()
+            hits = search.search_pages(query, corpus_root)
+            elapsed = time.perf_counter() - start
+            if i == 0:
+                first = elapsed
+            else:
+                warm.append(elapsed)
+        results[f"query_{label}"] = dict(_timings(warm), first_seconds=round(first, 6), hits=len(hits))
+    return results
+
+
+def bench_export(rows):
+    """Every export format over rows synthetic NSW listings"""
+    import export
+    import nsw_scraper
+    rng = random.Random(0)
+    data = [
+        [f"{rng.randint(1, 28):02d}/05/2025", "9:30 AM", f"2025/{rng.randint(0, 99999999):08d}",
+         f"Police v Person {i}", "Criminal", "Local Court", "Mention", "Magistrate Example",
+         "Downing Centre Local Court", f"Courtroom {rng.randint(1, 9)}.{rng.randint(1, 4)}", str(i)]
+        for i in range(rows)
+    ]
+    results = {}
+    for fmt in export.formats():
+        start = time.perf_counter()
+        size = len(export.to_bytes(fmt, nsw_scraper.HEADERS, data))
+        seconds = time.perf_counter() - start
+        results[fmt] = {
+            'rows': rows,
+            'bytes': size,
+            'seconds': round(seconds, 4),
+            'rows_per_s': round(rows / seconds, 1),
+            'mb_per_s': round(size / seconds / 1e6, 2),
+        }
+    return results
+
+
+def bench_startup(app_root, reruns=10, query=QUERIES[0]):
+    """Cold start and rerun times of each Streamlit app (needs an index).
+
+    Each app runs in its own interpreter: the first run pays for its imports
+    and shared resources, warm is the background warm-up still running after
+    it, reruns are what every widget interaction costs.
+    modules lists the heavy optional dependencies the run ended up loading.
+    """
+    results = {}
+    for app, steps in APPS.items():
+        proc = subprocess.run(
+            [sys.executable, '-c', _APP_RUN, os.path.join(app_root, app), json.dumps(steps), query,
+             str(reruns), json.dumps(HEAVY_MODULES)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode:
+            results[app] = {'error': (proc.stderr.strip() or proc.stdout.strip()).splitlines()[-1]}
+            continue
+        out = json.loads(proc.stdout.strip().splitlines()[-1])
+        result = {
+            'framework_seconds': round(out['framework_seconds'], 4),
+            'cold_seconds': round(out['cold_seconds'], 4),
+            'warm_seconds': round(out['warm_seconds'], 4),
+            'rerun': _timings(out['rerun']),
+            'modules': out['modules'],
+        }
+        if 'search_seconds' in out:
+            result['search_seconds'] = round(out['search_seconds'], 4)
+            result['search_rerun'] = _timings(out['search_rerun'])
+        results[app] = result
+    return results
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_api(corpus_root, clients=32, requests=25):
+    """The search service under clients concurrent users.
+
+    'unique' sends every client distinct party names (all cache misses),
+    'popular' has them all draw from the same few names (mostly cache hits).
+    """
+    import urllib.request
+    import search_api
+    start = time.perf_counter()
+    service = search_api.SearchService(corpus_root)
+    load = time.perf_counter() - start
+    server = search_api.serve(service, 0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with service.connection() as conn:
+            parties = sorted(r[0] for r in conn.execute("SELECT DISTINCT party FROM listings"))
+        rng = random.Random(0)
+        rng.shuffle(parties)
+        results = {'load_seconds': round(load, 4), 'clients': clients}
+        for mix in ('unique', 'popular'):
+            service.invalidate()  # each mix starts with a cold cache
+            names = parties[:clients * requests] if mix == 'unique' else parties[:10] + QUERIES
+            latencies = []
+            lock = threading.Lock()
+
+            def user(i):
+                mine = random.Random(i)
+                for j in range(requests):
+                    name = names[(i * requests + j) % len(names)] if mix == 'unique' else mine.choice(names)
+                    endpoint = ('hits', 'listings', 'fuzzy')[j % 3]
+                    query = urllib.parse.urlencode({'name': name})
+                    t = time.perf_counter()
+                    with urllib.request.urlopen(f"{url}/{endpoint}?{query}", timeout=60) as r:
+                        r.read()
+                    with lock:
+                        latencies.append(time.perf_counter() - t)
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=user, args=(i,)) for i in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = time.perf_counter() - start
+            results[mix] = dict(_timings(latencies), requests_per_s=round(len(latencies) / seconds, 1))
+        return results
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def bench_download(corpus_root, dest_root, latency=0.0):
+    """court_scraper against a local stand-in serving one day of the corpus.
+
+    The second run revalidates with conditional GETs and should be all 304s.
+    """
+    import court_scraper
+    day = min(os.listdir(os.path.join(corpus_root, min(os.listdir(corpus_root)))))
+    handler = type('Handler', (_Handler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(handler, directory=os.path.abspath(corpus_root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        port = server.server_address[1]
+        urls = {court: f"http://127.0.0.1:{port}/{court}/{day}" for court in sorted(os.listdir(corpus_root))
+                if os.path.exists(os.path.join(corpus_root, court, day))}
+        results = {}
+        for run in ('cold', 'revalidate'):
+            start = time.perf_counter()
+            fetched = court_scraper.fetch_all(urls, 'bench', dest_root, backoff=0.1)
+            seconds = time.perf_counter() - start
+            size = sum(r['bytes'] for r in fetched.values())
+            statuses = {}
+            for r in fetched.values():
+                statuses[r['status']] = statuses.get(r['status'], 0) + 1
+            results[run] = {
+                'files': len(fetched),
+                'bytes': size,
+                'seconds': round(seconds, 4),
+                'files_per_s': round(len(fetched) / seconds, 2),
+                'mb_per_s': round(size / seconds / 1e6, 2),
+                'statuses': statuses,
+            }
+        results['latency_seconds'] = latency
+        return results
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(obj, prefix=''):
+    for key, value in obj.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(results, baseline, tolerance):
+    """Return [(metric, old, new)] that got worse by more than tolerance (a fraction)"""
+    old = dict(_flatten(baseline['results']))
+    worse = []
+    for key, new in _flatten(results['results']):
+        if key not in old or not old[key]:
+            continue
+        if key.endswith('seconds') and new > old[key] * (1 + tolerance):
+            worse.append((key, old[key], new))
+        elif key.endswith('_per_s') and new < old[key] * (1 - tolerance):
+            worse.append((key, old[key], new))
+    return worse
+
+
+BENCHMARKS = ('extract', 'search', 'api', 'export', 'download', 'startup')
+
+
+def run(days=5, workers=os.cpu_count(), repeats=20, export_rows=100_000, latency=0.0,
+        only=BENCHMARKS, samples_root='data', urls_path='urls.json', workdir=None):
+    """Build a corpus in workdir (a temporary directory by default) and run the benchmarks"""
+    samples_root, urls_path = os.path.abspath(samples_root), os.path.abspath(urls_path)
+    app_root = os.path.dirname(os.path.abspath(__file__))
+    cwd = os.getcwd()
+    tmp = workdir or tempfile.mkdtemp(prefix='courtlists-bench-')
+    os.makedirs(tmp, exist_ok=True)
+    metrics.REGISTRY.reset()
+    try:
+        # cache/ is relative, so working inside tmp keeps the real caches untouched
+        os.chdir(tmp)
+        corpus = make_corpus('data', days, samples_root, urls_path)
+        results = {}
+        if 'extract' in only or 'search' in only or 'api' in only or 'startup' in only:
+            results['extract'] = bench_extract('data', workers)
+        if 'search' in only:
+            results['search'] = bench_search('data', repeats)
+        if 'api' in only:
+            results['api'] = bench_api('data')
+        if 'export' in only:
+            results['export'] = bench_export(export_rows)
+        if 'download' in only:
+            results['download'] = bench_download('data', 'download', latency)
+        if 'startup' in only:
+            # The apps read these relative to the working directory
+            shutil.copy(os.path.join(app_root, 'regions.json'), 'regions.json')
+            results['startup'] = bench_startup(app_root)
+    finally:
+        os.chdir(cwd)
+        if not workdir:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'days': days,
+        },
+        'corpus': corpus,
+        'results': results,
+        'metrics': metrics.REGISTRY.summary(),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark extraction, indexing, search, export and download on a synthetic archive")
+    parser.add_argument('--days', type=int, default=5, help="weekdays of lists per court (121 courts)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="extraction processes")
+    parser.add_argument('--repeats', type=int, default=20, help="warm runs per query")
+    parser.add_argument('--export-rows', type=int, default=100_000)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the download stand-in waits per request")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--workdir', help="build the corpus here and keep it (default: a temporary directory)")
+    parser.add_argument('--out', help="write the JSON results here (default: stdout)")
+    parser.add_argument('--baseline', help="earlier results JSON; exit 1 if anything regressed past --tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    results = run(args.days, args.workers, args.repeats, args.export_rows, args.latency, args.only,
+                  workdir=args.workdir)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+        print(f"✅ Results written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            worse = compare(results, json.load(f), args.tolerance)
+        for key, old, new in worse:
+            print(f"⚠️ {key}: {old} -> {new}", file=sys.stderr)
+        if worse:
+            sys.exit(1)
+        print("✅ No regressions against the baseline", file=sys.stderr)
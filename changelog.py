@@ -0,0 +1,239 @@
+from collections import Counter
+from text_cache import normalize
+
+# Day-over-day changes per court, derived from the parsed listing rows:
+# each list is compared with the same court's previous list and the rows it
+# adds or drops are kept here, so "who is newly listed this morning" reads a
+# few rows instead of rescanning every list. An appearance is a party (in any
+# name order) and matter type; adjourned matters that come back, even at
+# another time or in another courtroom, are not new. A court's first list
+# counts every row as added.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS diffs (
+    file_id INTEGER PRIMARY KEY,
+    prev_file_id INTEGER,
+    court TEXT NOT NULL,
+    date TEXT NOT NULL,
+    prev_date TEXT,
+    added INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS diffs_date ON diffs (date, court);
+CREATE TABLE IF NOT EXISTS changes (
+    file_id INTEGER NOT NULL,
+    court TEXT NOT NULL,
+    date TEXT NOT NULL,
+    prev_date TEXT,
+    change TEXT NOT NULL,
+    page INTEGER,
+    party TEXT NOT NULL,
+    party_norm TEXT NOT NULL,
+    party_key TEXT NOT NULL,
+    courtroom TEXT,
+    time TEXT,
+    matter_type TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_date ON changes (date, court);
+CREATE INDEX IF NOT EXISTS changes_file ON changes (file_id);
+"""
+
+CHANGES = ('added', 'removed')
+COLUMNS = ['court', 'date', 'prev_date', 'change', 'page', 'party', 'courtroom', 'time', 'matter_type']
+_ROW = ['page', 'party', 'party_norm', 'party_key', 'courtroom', 'time', 'matter_type']
+
+
+def _key(row):
+    return row['party_key'], row['matter_type']
+
+
+def diff(prev_rows, rows):
+    """Return (added, removed): rows only in rows, and only in prev_rows.
+
+    Rows are compared as appearances (see above), counting repeats, so a
+    party listed twice today and once yesterday has one added row.
+    """
+    remaining = Counter(_key(row) for row in prev_rows)
+    added = []
+    for row in rows:
+        if remaining[_key(row)] > 0:
+            remaining[_key(row)] -= 1
+        else:
+            added.append(row)
+    kept = Counter(_key(row) for row in rows)
+    removed = []
+    for row in prev_rows:
+        if kept[_key(row)] > 0:
+            kept[_key(row)] -= 1
+        else:
+            removed.append(row)
+    return added, removed
+
+
+def _rows(conn, file_id):
+    if file_id is None:
+        return []
+    return [dict(zip(_ROW, r)) for r in conn.execute(
+        f"SELECT {', '.join(_ROW)} FROM listings WHERE file_id = ? ORDER BY page, rowid", (file_id,))]
+
+
+def delete_file(conn, file_id):
+    """Drop the changes recorded for one list. Call inside a transaction."""
+    conn.execute("DELETE FROM changes WHERE file_id = ?", (file_id,))
+    conn.execute("DELETE FROM diffs WHERE file_id = ?", (file_id,))
+
+
+def update(conn):
+    """Diff every indexed list whose own or previous list is new or changed.
+
+    Returns the number of lists diffed. Cheap when nothing has changed: one
+    pass over the files and diffs tables.
+    """
+    current = {}
+    prev = (None, None, None)
+    for file_id, court, file in conn.execute("SELECT id, court, file FROM files ORDER BY court, file"):
+        date = file[:-len('.pdf')]
+        prev_id, prev_date = (prev[0], prev[2]) if prev[1] == court else (None, None)
+        current[file_id] = (prev_id, court, date, prev_date)
+        prev = (file_id, court, date)
+    done = dict(conn.execute("SELECT file_id, prev_file_id FROM diffs"))
+    stale = [file_id for file_id in done if file_id not in current]
+    pending = [file_id for file_id, (prev_id, *_) in current.items()
+               if file_id not in done or done[file_id] != prev_id]
+    if not stale and not pending:
+        return 0
+    with conn:
+        for file_id in stale + pending:
+            delete_file(conn, file_id)
+        for file_id in pending:
+            prev_id, court, date, prev_date = current[file_id]
+            added, removed = diff(_rows(conn, prev_id), _rows(conn, file_id))
+            conn.executemany(
+                f"INSERT INTO changes (file_id, court, date, prev_date, change, {', '.join(_ROW)})"
+                f" VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(_ROW))})",
+                [(file_id, court, date, prev_date, change, *(row[c] for c in _ROW))
+                 for change, group in zip(CHANGES, (added, removed)) for row in group])
+            conn.execute(
+                "INSERT INTO diffs (file_id, prev_file_id, court, date, prev_date, added, removed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_id, prev_id, court, date, prev_date, len(added), len(removed)))
+    return len(pending)
+
+
+def find(conn, since=None, until=None, courts=None, change='added', party=None, first=True):
+    """Return change rows (dicts with COLUMNS) matching every given filter.
+
+    since/until are inclusive YYYY-MM-DD dates of the newer list, change is
+    'added', 'removed' or None for both, party a substring of the normalized
+    party name. first=False leaves out each court's first list, where every
+    row counts as added.
+    """
+    where, args = [], []
+    if since:
+        where.append("date >= ?")
+        args.append(since)
+    if until:
+        where.append("date <= ?")
+        args.append(until)
+    if courts is not None:
+        where.append(f"court IN ({','.join('?' * len(courts))})")
+        args.extend(courts)
+    if change:
+        where.append("change = ?")
+        args.append(change)
+    if party:
+        where.append("instr(party_norm, ?) > 0")
+        args.append(normalize(party))
+    if not first:
+        where.append("prev_date IS NOT NULL")
+    sql = f"SELECT {', '.join(COLUMNS)}, party_norm FROM changes"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY date, court, change, page, time, party"
+    return [dict(zip(COLUMNS + ['party_norm'], row)) for row in conn.execute(sql, args)]
+
+
+def summary(conn, since=None, until=None, courts=None):
+    """Return [(court, date, prev_date, added, removed)] for each diffed list"""
+    where, args = [], []
+    if since:
+        where.append("date >= ?")
+        args.append(since)
+    if until:
+        where.append("date <= ?")
+        args.append(until)
+    if courts is not None:
+        where.append(f"court IN ({','.join('?' * len(courts))})")
+        args.extend(courts)
+    sql = "SELECT court, date, prev_date, added, removed FROM diffs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return conn.execute(sql + " ORDER BY date, court", args).fetchall()
+
+
+def watch(conn, names, since=None, until=None, courts=None, first=True):
+    """Yield (name, court, date, page) for watchlist names among the added rows.
+
+    Names match party names the way watchlist.scan matches page text
+    (substrings, "John Smith" also as "smith, john"), but only new
+    appearances are read.
+    """
+    import watchlist
+    automaton, owners = watchlist.build(names)
+    for row in find(conn, since, until, courts, 'added', first=first):
+        matched = set()
+        for index in automaton.search(row['party_norm']):
+            matched.update(owners[index])
+        for name in sorted(matched):
+            yield name, row['court'], row['date'], row['page']
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    import contextlib
+    import search
+    import search_index
+    from tabulate import tabulate
+    parser = argparse.ArgumentParser(description="Show who was newly listed (or dropped) since each court's previous list")
+    parser.add_argument('--date', help="lists dated YYYY-MM-DD (default: the latest date in the index)")
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help="lists dated on or after this day (instead of --date)")
+    parser.add_argument('--until', metavar='YYYY-MM-DD', help="lists dated on or before this day")
+    parser.add_argument('--court', action='append', help="only this court folder (repeatable)")
+    parser.add_argument('--region', action='append', help=f"only the courts in this region from {search.REGIONS_PATH} (repeatable)")
+    parser.add_argument('--party', help="party name (substring)")
+    parser.add_argument('--removed', action='store_true', help="show rows dropped since the previous list instead")
+    parser.add_argument('--all', action='store_true', help="show both added and removed rows")
+    parser.add_argument('--no-first', action='store_true', help="skip each court's first list (every row counts as added)")
+    parser.add_argument('--summary', action='store_true', help="count added and removed rows per list instead")
+    parser.add_argument('--watchlist', metavar='FILE', help="check the names in FILE against the new appearances only")
+    parser.add_argument('--out', help="with --watchlist, write hits here (.csv or .jsonl) instead of stdout")
+    args = parser.parse_args()
+    try:
+        courts = search.select_courts(args.court, args.region)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with contextlib.closing(search_index.connect()) as conn:
+        search_index.update_index(conn)
+        since, until = args.since, args.until
+        if not since and not until:
+            since = until = args.date or conn.execute("SELECT max(date) FROM diffs").fetchone()[0]
+        if args.watchlist:
+            import watchlist
+            hits = watch(conn, watchlist.load_names(args.watchlist), since, until, courts, first=not args.no_first)
+            fmt = 'jsonl' if args.out and args.out.endswith('.jsonl') else 'csv'
+            if args.out:
+                with open(args.out, 'w', newline='', encoding='utf-8') as f:
+                    n = watchlist.write_hits(hits, f, fmt)
+                print(f"✅ {n} watchlist hit(s) among new appearances written to {args.out}")
+            else:
+                watchlist.write_hits(hits, sys.stdout, fmt)
+            sys.exit()
+        if args.summary:
+            rows = summary(conn, since, until, courts)
+            print(tabulate(rows, headers=['court', 'date', 'previous', 'added', 'removed']))
+            sys.exit()
+        change = None if args.all else ('removed' if args.removed else 'added')
+        rows = find(conn, since, until, courts, change, args.party, first=not args.no_first)
+        print(tabulate([[r[c] for c in COLUMNS] for r in rows], headers=COLUMNS))
+        print(f"\n{len(rows)} {change or 'changed'} row(s)")
@@ -1,25 +1,450 @@
 import os
-import requests
+import time
 import json
+import random
+import shutil
+import hashlib
+import contextlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-import subprocess
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import archive
+import changelog
+import manifest
+import metrics
+import search_index
+import watchlist
+from text_cache import file_hash, iter_pdfs, load_entry
+
+# Fetch tuning: all ~120 lists live on one host, so bound concurrency per host
+# and reuse keep-alive connections instead of a fresh handshake per court
+PER_HOST = 6
+RETRIES = 3
+BACKOFF = 1.0
+TIMEOUT = 20
+BUDGET = 600
+
+# PDFs are stored once by content hash under data/.objects and each dated
+# filename is a hard link to its object. Git keeps no hard links, so the
+# objects are local only (.gitignore): the committed dated files share
+# blobs in the repository anyway. On a fresh checkout each court's object is
+# restored from its committed dated file with the saved hash, so the state
+# file's ETag/Last-Modified still let an unchanged list be skipped with a
+# conditional GET.
+OBJECTS_DIR = '.objects'
+STATE_FILE = '.scraper_state.json'
+
+_local = threading.local()
+
+
+def _session(per_host):
+    # One pooled session per worker thread; each keeps its connection alive
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=per_host)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+
+def _retryable(e):
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+def object_path(root, digest):
+    return os.path.join(root, OBJECTS_DIR, digest[:2], f"{digest}.pdf")
+
+
+def _link(src, dst):
+    # Hard link where the filesystem allows it, otherwise fall back to a copy.
+    # rename() is a no-op between two links to one inode, so check first.
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp = dst + '.part'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def store(root, content, filename):
+    """Save content under its hash and point filename at it. Returns (digest, is_new)."""
+    digest = hashlib.sha256(content).hexdigest()
+    obj = object_path(root, digest)
+    is_new = not os.path.exists(obj)
+    if is_new:
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        # Write then rename so a half-finished download never looks like a PDF
+        tmp = obj + '.part'
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, obj)
+    _link(obj, filename)
+    return digest, is_new
+
+
+def restore_object(root, court, digest, known=None):
+    """Put digest back in the object store from the court's own dated files.
+
+    A fresh checkout has the committed lists but no object store, and the
+    conditional request needs the object to answer a 304 from. The newest
+    dated file whose manifest record (known) has digest is checked and linked
+    in; files the manifest doesn't know are hashed. Returns whether the
+    object is in the store.
+    """
+    obj = object_path(root, digest)
+    if os.path.exists(obj):
+        return True
+    known = manifest.current(root) if known is None else known
+    try:
+        files = sorted((f for f in os.listdir(os.path.join(root, court)) if f.endswith('.pdf')), reverse=True)
+    except OSError:
+        return False
+    for file in files:
+        record = known.get((court, file))
+        if record and (record['status'] != 'ok' or record['sha256'] != digest):
+            continue
+        path = os.path.join(root, court, file)
+        if file_hash(path) == digest:
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            _link(path, obj)
+            return True
+    return False
+
+
+def fetch(court, url, filename, deadline, host_slots, per_host=PER_HOST,
+          retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT, root='data', validators=None):
+    """Download one law list to filename, retrying transient failures.
+
+    Waits for a slot on the URL's host, retries connection errors, timeouts,
+    429s and 5xx responses with jittered exponential backoff, and never runs
+    past deadline. validators is the URL's saved state; when its object is
+    still on disk the request is conditional and a 304 just links filename to
+    it. Returns a per-court result dict whose status is 'ok', 'unchanged'
+    (304), 'duplicate' (same bytes as a stored object) or 'failed'.
+    """
+    result = {'court': court, 'status': 'failed', 'bytes': 0, 'attempts': 0, 'seconds': 0.0, 'error': None}
+    start = time.monotonic()
+    slot = host_slots[urlparse(url).netloc]
+    validators = validators or {}
+    headers = {}
+    if validators.get('sha256') and os.path.exists(object_path(root, validators['sha256'])):
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    for attempt in range(retries + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            result['error'] = result['error'] or "wall-clock budget exhausted"
+            break
+        # Waiting for a free connection to the host counts against the budget too
+        if not slot.acquire(timeout=remaining):
+            result['error'] = "wall-clock budget exhausted waiting for a connection slot"
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            slot.release()
+            result['error'] = "wall-clock budget exhausted waiting for a connection slot"
+            break
+        result['attempts'] += 1
+        try:
+            try:
+                r = _session(per_host).get(url, headers=headers, timeout=min(timeout, remaining))
+                r.raise_for_status()
+                content = r.content
+            finally:
+                slot.release()
+            result.update(etag=r.headers.get('ETag', validators.get('etag')),
+                          last_modified=r.headers.get('Last-Modified', validators.get('last_modified')))
+            if r.status_code == 304:
+                _link(object_path(root, validators['sha256']), filename)
+                result.update(status='unchanged', sha256=validators['sha256'], error=None)
+            else:
+                digest, is_new = store(root, content, filename)
+                result.update(status='ok' if is_new else 'duplicate', bytes=len(content),
+                              sha256=digest, error=None)
+            break
+        except Exception as e:
+            result['error'] = str(e)
+            if not _retryable(e) or attempt == retries:
+                break
+            delay = random.uniform(0, backoff * 2 ** attempt)
+            time.sleep(max(0, min(delay, deadline - time.monotonic())))
+    result['seconds'] = round(time.monotonic() - start, 3)
+    metrics.observe('download_seconds', result['seconds'], court=court, status=result['status'])
+    metrics.inc('download_bytes_total', result['bytes'], court=court)
+    metrics.inc('downloads_total', court=court, status=result['status'])
+    metrics.log('download', **result)
+    return result
+
+
+def ingest(root, court, file, conn, digest=None, known=None):
+    """Validate, extract and index one list, then record it in the manifest.
 
-# Load court URLs
-with open('urls.json') as f:
-    court_urls = json.load(f)
+    Files the manifest already has with the same size and mtime are skipped
+    (known is manifest.current(root), passed in when ingesting many files).
+    A corrupt or truncated PDF is moved to quarantine, its stored object
+    dropped so the next run downloads it afresh, and recorded as
+    'quarantined'. Returns the new manifest record, or None if skipped.
+    Anything else that goes wrong (a locked index, a full disk, a failed
+    cache write) is raised with nothing moved or recorded, so the file is
+    retried next time.
+    Lists already packed by archive.py were validated when packed and are
+    recorded from the archive index.
+    """
+    path = os.path.join(root, court, file)
+    size, mtime = archive.stat(path)
+    prev = (manifest.current(root) if known is None else known).get((court, file))
+    if prev and prev['status'] == 'ok' and (prev['bytes'], prev['mtime']) == (size, mtime):
+        return None
+    packed = None if os.path.exists(path) else archive.locate(path)
+    record = {'court': court, 'date': file[:-len('.pdf')], 'file': file,
+              'sha256': packed['sha256'] if packed else digest or file_hash(path),
+              'pages': None, 'bytes': size, 'mtime': mtime, 'status': 'ok', 'error': None,
+              'ts': round(time.time(), 3)}
+    with metrics.timer('ingest_seconds') as t:
+        t['file'] = path
+        if packed:
+            record['pages'] = packed['pages']
+            search_index.index_file(conn, root, court, file)
+            metrics.inc('ingest_total', status='packed')
+            manifest.append(root, record)
+            return record
+        try:
+            record['pages'] = manifest.validate(path)
+            load_entry(path)
+        except (OSError, ImportError):
+            # Reading the file or writing the text cache failed, not the PDF
+            raise
+        except Exception as e:
+            # validate() or every text extractor rejected the file itself
+            record.update(status='quarantined', error=str(e))
+            search_index.remove_file(conn, court, file)
+            manifest.quarantine(root, court, file)
+            obj = object_path(root, record['sha256'])
+            if os.path.exists(obj):
+                os.remove(obj)
+        else:
+            search_index.index_file(conn, root, court, file)
+    metrics.inc('ingest_total', status=record['status'])
+    manifest.append(root, record)
+    return record
 
-today = datetime.now().strftime('%Y-%m-%d')
 
-for court, url in court_urls.items():
-    court_dir = os.path.join('data', court)
-    os.makedirs(court_dir, exist_ok=True)
-    filename = os.path.join(court_dir, f"{today}.pdf")
-    
+def ingest_all(root, conn):
+    """Ingest every PDF under root the manifest doesn't have yet (or that changed).
+
+    Walks the whole folder, so it is for bootstrapping the manifest and for
+    lists copied in by hand. Returns the new manifest records; files that
+    could not be ingested for reasons other than corruption are reported and
+    left for the next run.
+    """
+    known = manifest.current(root)
+    records = []
+    for court, file in sorted(iter_pdfs(root)):
+        try:
+            record = ingest(root, court, file, conn, known=known)
+        except Exception as e:
+            print(f"⚠️ Could not ingest {court}/{file}, will retry: {e}")
+            continue
+        if record:
+            records.append(record)
+    return records
+
+
+def index_previous(root, conn, courts, day, known=None):
+    """Index each court's last list before day, so day's list is diffed
+    against it. A fresh checkout's index holds only what this run fetched,
+    and its committed manifest means nothing else gets ingested. Returns the
+    number of lists indexed."""
+    known = manifest.current(root) if known is None else known
+    courts = set(courts)
+    previous = {}
+    for (court, file), record in known.items():
+        if court in courts and record['status'] == 'ok' and file < f"{day}.pdf":
+            previous[court] = max(previous.get(court, file), file)
+    indexed = 0
+    for court, file in sorted(previous.items()):
+        try:
+            indexed += search_index.index_file(conn, root, court, file)
+        except Exception as e:
+            print(f"⚠️ Could not index {court}/{file} to diff against: {e}")
+    return indexed
+
+
+def load_state(root='data'):
     try:
-        r = requests.get(url, timeout=20)
-        r.raise_for_status()
-        with open(filename, 'wb') as f:
-            f.write(r.content)
-        print(f"✅ Downloaded {court}")
-    except Exception as e:
-        print(f"❌ Failed for {court}: {e}")
+        with open(os.path.join(root, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(root, state):
+    path = os.path.join(root, STATE_FILE)
+    with open(path + '.part', 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + '.part', path)
+
+
+def fetch_all(court_urls, day, root='data', per_host=PER_HOST, retries=RETRIES,
+              backoff=BACKOFF, timeout=TIMEOUT, budget=BUDGET, on_result=None):
+    """Download every court's list for day into root/<court>/<day>.pdf concurrently.
+
+    Conditional-request state is read from and saved back to root. Returns
+    {court: result}. on_result, if given, is called in the calling thread
+    with (court, filename, result) as each download finishes; setting the
+    result's status to 'failed' there keeps its validators out of the state.
+    """
+    state = load_state(root)
+    known = manifest.current(root)
+    for court, url in court_urls.items():
+        if state.get(url, {}).get('sha256'):
+            restore_object(root, court, state[url]['sha256'], known)
+    deadline = time.monotonic() + budget
+    host_slots = {}
+    for url in court_urls.values():
+        host_slots.setdefault(urlparse(url).netloc, threading.BoundedSemaphore(per_host))
+
+    results = {}
+    workers = per_host * len(host_slots)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for court, url in court_urls.items():
+            court_dir = os.path.join(root, court)
+            os.makedirs(court_dir, exist_ok=True)
+            filename = os.path.join(court_dir, f"{day}.pdf")
+            future = pool.submit(fetch, court, url, filename, deadline, host_slots,
+                                 per_host, retries, backoff, timeout, root, state.get(url))
+            futures[future] = (court, url, filename)
+        for future in as_completed(futures):
+            court, url, filename = futures[future]
+            result = results[court] = future.result()
+            # on_result may still mark the download failed (e.g. quarantined)
+            if on_result:
+                on_result(court, filename, result)
+            if result['status'] != 'failed':
+                state[url] = {k: result.get(k) for k in ('etag', 'last_modified', 'sha256')}
+    save_state(root, state)
+    return results
+
+
+def index_path_for(root):
+    """The search index for lists under root: the shared one for data/,
+    otherwise one inside root, so trial runs never touch it"""
+    if os.path.abspath(root) == os.path.abspath('data'):
+        return search_index.INDEX_PATH
+    return os.path.join(root, '.index.sqlite')
+
+
+def main(urls_path='urls.json', root='data', summary_path=None, watchlist_path=None, watchlist_out=None,
+         new_only=False, index_path=None, **options):
+    # Load court URLs
+    with open(urls_path) as f:
+        court_urls = json.load(f)
+
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    # Each download goes through validate -> extract -> index -> manifest.
+    # The first run records the lists already on disk, so searches can switch
+    # from walking data/ to reading the manifest without losing any.
+    index = search_index.connect(index_path or index_path_for(root))
+    if not manifest.exists(root):
+        backfilled = ingest_all(root, index)
+        print(f"📒 Recorded {len(backfilled)} existing file(s) in {manifest.manifest_path(root)}")
+
+    def downloaded(court, filename, result):
+        if result['status'] == 'failed':
+            print(f"❌ Failed for {court}: {result['error']}")
+            return
+        if result['status'] == 'ok':
+            print(f"✅ Downloaded {court}")
+        else:
+            print(f"♻️ {court} unchanged, linked to the stored copy")
+        try:
+            record = ingest(root, court, os.path.basename(filename), index, result.get('sha256'))
+        except Exception as e:
+            print(f"⚠️ Could not ingest {filename}, will retry: {e}")
+            return
+        if record and record['status'] == 'quarantined':
+            result['status'] = 'failed'
+            result['error'] = f"quarantined: {record['error']}"
+            print(f"🧪 {court} quarantined: {record['error']}")
+
+    start = time.monotonic()
+    results = fetch_all(court_urls, today, root, on_result=downloaded, **options)
+    index_previous(root, index, [court for court, r in results.items() if r['status'] != 'failed'], today)
+    changed = changelog.update(index)
+    print(f"🗞️ Diffed {changed} list(s) against each court's previous list")
+
+    ok = [r for r in results.values() if r['status'] != 'failed']
+    unchanged = sum(r['status'] in ('unchanged', 'duplicate') for r in ok)
+    print(f"\n{len(ok)}/{len(results)} courts fetched ({unchanged} unchanged), "
+          f"{sum(r['bytes'] for r in ok) / 1e6:.1f} MB in {time.monotonic() - start:.1f}s")
+    for court in sorted(results):
+        r = results[court]
+        if r['status'] == 'failed' or r['attempts'] > 1:
+            print(f"  {court}: {r['status']} after {r['attempts']} attempt(s), {r['seconds']}s"
+                  + (f" ({r['error']})" if r['error'] else ""))
+
+    metrics.flush()
+
+    if summary_path:
+        with open(summary_path, 'w') as f:
+            json.dump({'date': today, 'results': results}, f, indent=2)
+
+    # Only today's lists need checking; earlier days were checked when they
+    # arrived. new_only narrows that to appearances yesterday's lists didn't have.
+    if watchlist_path:
+        names = watchlist.load_names(watchlist_path)
+        if new_only:
+            courts = [court for court, r in results.items() if r['status'] != 'failed']
+            hits = changelog.watch(index, names, today, today, courts)
+        else:
+            files = [(court, f"{today}.pdf") for court, r in results.items() if r['status'] != 'failed']
+            hits = watchlist.scan(names, root, files=files)
+        out = watchlist_out or f"watchlist-{today}.csv"
+        with open(out, 'w', newline='', encoding='utf-8') as f:
+            n = watchlist.write_hits(hits, f, 'jsonl' if out.endswith('.jsonl') else 'csv')
+        print(f"👀 {n} watchlist hit(s) written to {out}")
+    index.close()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Download today's law list for every court in urls.json")
+    parser.add_argument('--urls', default='urls.json')
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--per-host', type=int, default=PER_HOST, help="concurrent downloads per host")
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument('--budget', type=float, default=BUDGET, help="wall-clock limit for the whole run in seconds")
+    parser.add_argument('--summary', help="write per-court results to this JSON file")
+    parser.add_argument('--watchlist', help="after downloading, check today's lists for every name in this file")
+    parser.add_argument('--new-only', action='store_true', help="with --watchlist, only report names newly listed since each court's previous list")
+    parser.add_argument('--watchlist-out', help="where to write watchlist hits (.csv or .jsonl, default watchlist-<date>.csv)")
+    parser.add_argument('--index', help="search index to update (default: cache/index.sqlite for data/, else <root>/.index.sqlite)")
+    parser.add_argument('--ingest', action='store_true', help="don't download; ingest PDFs under --root the manifest doesn't have (e.g. copied in by hand)")
+    args = parser.parse_args()
+    if args.ingest:
+        with contextlib.closing(search_index.connect(args.index or index_path_for(args.root))) as conn:
+            records = ingest_all(args.root, conn)
+        bad = [r for r in records if r['status'] != 'ok']
+        print(f"📒 Ingested {len(records) - len(bad)} file(s), quarantined {len(bad)}")
+        for r in bad:
+            print(f"  🧪 {r['court']}/{r['file']}: {r['error']}")
+        raise SystemExit
+    main(args.urls, args.root, args.summary, args.watchlist, args.watchlist_out, args.new_only, args.index, per_host=args.per_host,
+         retries=args.retries, timeout=args.timeout, budget=args.budget)
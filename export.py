@@ -0,0 +1,140 @@
+import io
+import csv
+import json
+import functools
+import importlib.util
+
+# One place for every download and export: rows are streamed in batches into
+# the output (a file, an in-memory buffer or a chunked response), so nothing
+# is written to the working directory and memory stays bounded for csv/jsonl.
+# Parquet needs the optional pyarrow package. openpyxl and pyarrow are only
+# imported when an export in their format is actually built.
+
+# format -> (mime type, button label)
+FORMATS = {
+    'csv': ('text/csv', 'CSV'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'Excel'),
+    'jsonl': ('application/x-ndjson', 'JSON Lines'),
+    'parquet': ('application/vnd.apache.parquet', 'Parquet'),
+}
+
+# Rows per batch written to the output
+CHUNK_ROWS = 1000
+
+# Columns for QLD search hits; file names are dates
+HIT_HEADERS = ['Court', 'Date', 'Page']
+
+
+def hit_rows(hits):
+    """(court, file, page) search hits -> (court, date, page) rows"""
+    for court, file, page in hits:
+        yield court, file[:-len('.pdf')] if file.endswith('.pdf') else file, page
+
+
+def _batches(rows, size=CHUNK_ROWS):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@functools.lru_cache(maxsize=None)
+def available(fmt):
+    if fmt != 'parquet':
+        return fmt in FORMATS
+    # Looked up rather than imported: pyarrow takes longer to import than a
+    # whole Streamlit rerun, and formats() is called on every one
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def formats():
+    """The formats this installation can write"""
+    return [fmt for fmt in FORMATS if available(fmt)]
+
+
+def iter_csv(headers, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(headers, rows):
+    for batch in _batches(rows):
+        yield "".join(json.dumps(dict(zip(headers, row))) + "\n" for row in batch).encode('utf-8')
+
+
+def write_xlsx(headers, rows, out, title="Court Listings"):
+    # Write-only mode streams rows to the sheet instead of holding a cell
+    # object per value; openpyxl removes its spool file when saving
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(headers)
+    for row in rows:
+        ws.append(list(row))
+    wb.save(out)
+
+
+def write_parquet(headers, rows, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # Everything is written as text (NSW cells are strings; QLD pages are cast)
+    # so each column keeps one type across row groups; None stays null
+    schema = pa.schema([(h, pa.string()) for h in headers])
+    with pq.ParquetWriter(out, schema) as writer:
+        for batch in _batches(rows):
+            columns = list(zip(*batch))
+            writer.write_table(pa.table(
+                [pa.array([None if v is None else str(v) for v in col], pa.string()) for col in columns],
+                schema=schema,
+            ))
+
+
+def write(fmt, headers, rows, out):
+    """Stream rows in format fmt into the binary file object out"""
+    if fmt == 'csv':
+        for chunk in iter_csv(headers, rows):
+            out.write(chunk)
+    elif fmt == 'jsonl':
+        for chunk in iter_jsonl(headers, rows):
+            out.write(chunk)
+    elif fmt == 'xlsx':
+        write_xlsx(headers, rows, out)
+    elif fmt == 'parquet':
+        write_parquet(headers, rows, out)
+    else:
+        raise ValueError(f"unknown export format {fmt!r}")
+
+
+def to_bytes(fmt, headers, rows):
+    """The whole export as bytes, e.g. for st.download_button"""
+    buffer = io.BytesIO()
+    write(fmt, headers, rows, buffer)
+    return buffer.getvalue()
+
+
+def iter_chunks(fmt, headers, rows, chunk_size=64 * 1024):
+    """Yield the export as byte chunks for a chunked HTTP response.
+
+    csv and jsonl are produced as rows arrive; xlsx and parquet are zip/footer
+    based formats, so they are built in memory first and then sliced.
+    """
+    if fmt == 'csv':
+        yield from iter_csv(headers, rows)
+    elif fmt == 'jsonl':
+        yield from iter_jsonl(headers, rows)
+    else:
+        data = to_bytes(fmt, headers, rows)
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
@@ -0,0 +1,217 @@
+import os
+import shutil
+import functools
+import subprocess
+import time
+import threading
+import importlib.util
+import metrics
+
+# PDF text-extraction backends. Each takes a path and yields (text, seconds)
+# per page, importing its library only when run. extract() tries them in
+# ORDER, moving a document on to the next backend when one is missing, fails
+# or leaves pages empty, and records which backend produced every page.
+# Set PDF_EXTRACTORS (comma separated, e.g. "pypdf2,pdfminer") to choose.
+#
+# pypdfium2 reads the QLD lists several times faster than PyPDF2 with the
+# same names and listing rows, so it goes first when installed; run
+# `python extractors.py` on some lists to compare the engines here.
+DEFAULT_ORDER = ('pypdfium2', 'pypdf2', 'pdftotext', 'pdfminer')
+ORDER = tuple(name.strip() for name in os.environ.get('PDF_EXTRACTORS', ','.join(DEFAULT_ORDER)).split(',') if name.strip())
+
+PDFTOTEXT_TIMEOUT = 120
+
+# pdfium must not be called from two threads at once (scraper callbacks and
+# the Streamlit warm-up both extract), so its documents are read one at a time
+_pdfium_lock = threading.Lock()
+
+
+def _pypdf2(pdf_path):
+    import PyPDF2
+    with open(pdf_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for page in reader.pages:
+            start = time.perf_counter()
+            text = page.extract_text() or ""
+            yield text, time.perf_counter() - start
+
+
+def _pypdfium2(pdf_path):
+    import pypdfium2
+    pages = []
+    with _pdfium_lock:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for i in range(len(pdf)):
+                start = time.perf_counter()
+                page = pdf[i]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                pages.append((text.replace('\r\n', '\n'), time.perf_counter() - start))
+        finally:
+            pdf.close()
+    yield from pages
+
+
+def _pdfminer(pdf_path):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    pages = extract_pages(pdf_path)
+    while True:
+        start = time.perf_counter()
+        try:
+            layout = next(pages)
+        except StopIteration:
+            return
+        text = "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+        yield text, time.perf_counter() - start
+
+
+def _pdftotext(pdf_path):
+    # One process for the whole document; its time is split evenly over the pages
+    start = time.perf_counter()
+    out = subprocess.run(['pdftotext', '-layout', '-enc', 'UTF-8', pdf_path, '-'],
+                         capture_output=True, check=True, timeout=PDFTOTEXT_TIMEOUT).stdout
+    pages = out.decode('utf-8', 'replace').split('\f')
+    if pages and not pages[-1].strip():
+        pages.pop()
+    seconds = (time.perf_counter() - start) / max(len(pages), 1)
+    for text in pages:
+        yield text, seconds
+
+
+# name -> (page generator, check that it can run here)
+BACKENDS = {
+    'pypdf2': (_pypdf2, lambda: importlib.util.find_spec('PyPDF2') is not None),
+    'pypdfium2': (_pypdfium2, lambda: importlib.util.find_spec('pypdfium2') is not None),
+    'pdfminer': (_pdfminer, lambda: importlib.util.find_spec('pdfminer') is not None),
+    'pdftotext': (_pdftotext, lambda: shutil.which('pdftotext') is not None),
+}
+
+
+def available(order=None):
+    """The backends in order (default ORDER) that are installed here"""
+    return [name for name in (order or ORDER) if name in BACKENDS and BACKENDS[name][1]()]
+
+
+@functools.lru_cache(maxsize=None)
+def active_order():
+    """available() for ORDER, worked out once per process. Cached text
+    records it, so a new PDF_EXTRACTORS re-extracts lists already cached."""
+    return tuple(available())
+
+
+def run(name, pdf_path):
+    """[(text, seconds)] for every page of pdf_path with one backend"""
+    return list(BACKENDS[name][0](pdf_path))
+
+
+def extract(pdf_path, order=None):
+    """Return (texts, backends, seconds): per-page text, the backend that
+    produced it and the time it took.
+
+    The first available backend reads the whole document; if it raises or
+    leaves pages empty, the next one is run and fills in whatever it can.
+    Raises the first backend's error if none could read the file.
+    """
+    texts = backends = seconds = None
+    error = None
+    for name in available(order):
+        if texts is not None and all(t.strip() for t in texts):
+            break
+        try:
+            with metrics.timer('extract_file_seconds', backend=name) as t:
+                pages = run(name, pdf_path)
+                t.update(file=pdf_path, pages=len(pages))
+        except Exception as e:
+            error = error or e
+            metrics.inc('extract_fallbacks_total', backend=name, reason='error')
+            continue
+        if texts is None:
+            texts = [text for text, _ in pages]
+            backends = [name] * len(pages)
+            seconds = [s for _, s in pages]
+        elif len(pages) == len(texts):
+            for i, (text, s) in enumerate(pages):
+                if not texts[i].strip() and text.strip():
+                    texts[i], backends[i], seconds[i] = text, name, s
+        else:
+            continue
+        if not all(t.strip() for t in texts):
+            metrics.inc('extract_fallbacks_total', backend=name, reason='empty')
+    if texts is None:
+        raise error or RuntimeError(f"no PDF text extractor available (tried {', '.join(order or ORDER)})")
+    for name, s in zip(backends, seconds):
+        metrics.observe('extract_page_seconds', s, backend=name)
+        metrics.inc('pages_extracted_total', backend=name)
+    return texts, backends, seconds
+
+
+def compare(paths, order=None):
+    """Run every available backend over paths on its own.
+
+    Returns {backend: stats}: pages, seconds, pages_per_s, empty pages,
+    listing rows parsed, and how many of the first backend's rows (and
+    party names, as a substring search) the others reproduce.
+    """
+    import listings
+    from text_cache import normalize
+    stats, reference = {}, None
+    for name in available(order or tuple(BACKENDS)):
+        texts, seconds, failed = {}, 0.0, 0
+        for path in paths:
+            try:
+                pages = run(name, path)
+            except Exception:
+                failed += 1
+                continue
+            texts[path] = [text for text, _ in pages]
+            seconds += sum(s for _, s in pages)
+        rows = {path: [(r['party'], r['courtroom'], r['time']) for text in pages for r in listings.parse_page(text)]
+                for path, pages in texts.items()}
+        n = sum(len(pages) for pages in texts.values())
+        stats[name] = {
+            'files': len(texts),
+            'failed': failed,
+            'pages': n,
+            'seconds': round(seconds, 4),
+            'pages_per_s': round(n / seconds, 1) if seconds else None,
+            'empty_pages': sum(1 for pages in texts.values() for text in pages if not text.strip()),
+            'rows': sum(len(r) for r in rows.values()),
+        }
+        if reference is None:
+            reference = rows
+            continue
+        same = found = total = 0
+        for path, expected in reference.items():
+            got = rows.get(path, [])
+            same += sum(1 for row in expected if row in got)
+            text = " ".join(normalize(page) for page in texts.get(path, []))
+            for party, _, _ in expected:
+                total += 1
+                found += normalize(party) in text
+        stats[name]['same_rows'] = same
+        stats[name]['party_recall'] = round(found / total, 4) if total else None
+    return stats
+
+
+if __name__ == "__main__":
+    import glob
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare the PDF text extractors on some law lists")
+    parser.add_argument('paths', nargs='*', help="PDFs to read (default: one list per court under data/)")
+    parser.add_argument('--order', help="comma separated backends to compare; the first is the reference")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join('data', '*', '*.pdf')))[:200]
+    order = tuple(args.order.split(',')) if args.order else None
+    print(f"Configured order: {', '.join(ORDER)}; available here: {', '.join(available()) or 'none'}")
+    for name, s in compare(paths, order).items():
+        line = f"{name:10} {s['pages']:5} pages in {s['seconds']:7.2f}s ({s['pages_per_s']} pages/s), {s['rows']} rows"
+        if 'same_rows' in s:
+            line += f", {s['same_rows']} same rows, party recall {s['party_recall']:.1%}"
+        if s['failed'] or s['empty_pages']:
+            line += f" ⚠️ {s['failed']} failed, {s['empty_pages']} empty pages"
+        print(line)
@@ -0,0 +1,175 @@
+import re
+from name_index import name_key
+from text_cache import normalize
+
+# Typed table of parsed law list rows, kept alongside the full-text index so
+# it is rebuilt whenever a file is (re)indexed
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    file_id INTEGER NOT NULL,
+    court TEXT NOT NULL,
+    date TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    party TEXT NOT NULL,
+    party_norm TEXT NOT NULL,
+    party_key TEXT NOT NULL,
+    courtroom TEXT,
+    time TEXT,
+    matter_type TEXT,
+    court_name TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_court_date ON listings (court, date, time);
+CREATE INDEX IF NOT EXISTS listings_party ON listings (party_norm);
+CREATE INDEX IF NOT EXISTS listings_party_key ON listings (party_key);
+CREATE INDEX IF NOT EXISTS listings_file ON listings (file_id);
+"""
+
+COLUMNS = ['court', 'date', 'page', 'party', 'courtroom', 'time', 'matter_type', 'court_name']
+
+TIME_RE = re.compile(r'^(\d{1,2}):(\d{2})\s*([AP]M)$', re.IGNORECASE)
+PAGE_RE = re.compile(r'^\d+ of \d+$')
+COURTROOM_RE = re.compile(r'^\d+[A-Z]?$', re.IGNORECASE)
+# A whole row on one line, as pypdfium2 lays it out: party, courtroom, time
+ROW_RE = re.compile(r'^(.+?)(?:\s+(\d+[A-Z]?))?\s+(\d{1,2}:\d{2}\s*[AP]M)$', re.IGNORECASE)
+HEADER = {'matter', 'court', 'number', 'time', 'court number', 'matter court'}
+
+
+def _clock(text):
+    """'8:30AM' -> '08:30' so times sort and compare as strings"""
+    m = TIME_RE.match(text)
+    if not m:
+        return None
+    hour, minute, half = int(m.group(1)), m.group(2), m.group(3).upper()
+    hour = hour % 12 + (12 if half == 'PM' else 0)
+    return f"{hour:02d}:{minute}"
+
+
+def parse_page(text):
+    """Parse one page of a Magistrates daily law list into row dicts.
+
+    PyPDF2 lays each row out as the party (sometimes wrapped over several
+    lines), then the courtroom, then the time; pypdfium2 puts all three on
+    the party's last line. Some courts print no courtroom. The page footer
+    starts at the "N of M" line and names the court, e.g. "Cairns - 12 May
+    2025". Pages in other layouts (the Land Court list) yield no rows. The
+    Magistrates list does not print a matter type, so it is left empty.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    rows = []
+    pending = []
+    footer = len(lines)
+    for i, line in enumerate(lines):
+        if PAGE_RE.match(line):
+            footer = i
+            break
+        clock = _clock(line)
+        one_line = None if clock else ROW_RE.match(line)
+        if one_line:
+            party, courtroom, clock = pending + [one_line.group(1)], one_line.group(2), _clock(one_line.group(3))
+        elif clock and len(pending) >= 2 and COURTROOM_RE.match(pending[-1]):
+            party, courtroom = pending[:-1], pending[-1]
+        elif clock and len(pending) == 1:
+            party, courtroom = pending, None
+        elif clock:
+            # A time after something that isn't a party row: drop it
+            pending = []
+            continue
+        else:
+            if line and line.casefold() not in HEADER:
+                pending.append(line)
+            continue
+        rows.append({'party': " ".join(party), 'courtroom': courtroom, 'time': clock, 'matter_type': None})
+        pending = []
+
+    court_name = None
+    for i in range(footer, len(lines) - 1):
+        if lines[i].casefold() == 'daily law list':
+            court_name = lines[i + 1].rsplit(' - ', 1)[0].strip() or None
+            break
+    for row in rows:
+        row['court_name'] = court_name
+    return rows
+
+
+def store(conn, file_id, court, file, raw_pages):
+    """Replace the parsed rows for one indexed file and return them.
+
+    Call inside a transaction.
+    """
+    date = file[:-len('.pdf')]
+    rows = [dict(row, page=page) for page, text in enumerate(raw_pages, start=1) for row in parse_page(text)]
+    conn.execute("DELETE FROM listings WHERE file_id = ?", (file_id,))
+    conn.executemany(
+        "INSERT INTO listings (file_id, court, date, page, party, party_norm, party_key, courtroom, time, matter_type, court_name)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (file_id, court, date, row['page'], row['party'], normalize(row['party']), name_key(row['party']),
+             row['courtroom'], row['time'], row['matter_type'], row['court_name'])
+            for row in rows
+        ],
+    )
+    return rows
+
+
+def find(conn, court=None, since=None, until=None, time=None, party=None, exact=False, party_keys=None, courts=None):
+    """Return listing rows (dicts with COLUMNS) matching every given filter.
+
+    since/until are inclusive YYYY-MM-DD dates, time is '9:00AM' or '09:00',
+    party is matched against the normalized party name, as a substring unless
+    exact=True. party_keys restricts rows to those name_index keys and courts
+    to those court folders.
+    """
+    where, args = [], []
+    if court:
+        where.append("court = ?")
+        args.append(court)
+    if courts is not None:
+        where.append(f"court IN ({','.join('?' * len(courts))})")
+        args.extend(courts)
+    if since:
+        where.append("date >= ?")
+        args.append(since)
+    if until:
+        where.append("date <= ?")
+        args.append(until)
+    if time:
+        where.append("time = ?")
+        args.append(_clock(time.replace(' ', '')) or time)
+    if party:
+        if exact:
+            where.append("party_norm = ?")
+            args.append(normalize(party))
+        else:
+            where.append("instr(party_norm, ?) > 0")
+            args.append(normalize(party))
+    if party_keys is not None:
+        where.append(f"party_key IN ({','.join('?' * len(party_keys))})")
+        args.extend(party_keys)
+    sql = f"SELECT {', '.join(COLUMNS)}, party_key FROM listings"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY date, court, time, party"
+    return [dict(zip(COLUMNS + ['party_key'], row)) for row in conn.execute(sql, args)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    import search_index
+    from tabulate import tabulate
+    parser = argparse.ArgumentParser(description="Query parsed law list rows, e.g. all 9:00 matters in one court this week")
+    parser.add_argument('--court')
+    parser.add_argument('--since', help="YYYY-MM-DD")
+    parser.add_argument('--until', help="YYYY-MM-DD")
+    parser.add_argument('--time', help="e.g. 9:00AM")
+    parser.add_argument('--party', help="party name (substring)")
+    parser.add_argument('--exact', action='store_true', help="match --party exactly")
+    args = parser.parse_args()
+
+    with contextlib.closing(search_index.connect()) as conn:
+        search_index.update_index(conn)
+        rows = find(conn, args.court, args.since, args.until, args.time, args.party, args.exact)
+    if rows:
+        print(tabulate([[r[c] for c in COLUMNS] for r in rows], headers=COLUMNS))
+    else:
+        print("No matching listings.")
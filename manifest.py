@@ -0,0 +1,158 @@
+import os
+import json
+import shutil
+import threading
+from text_cache import court_pdfs, iter_pdfs as walk_pdfs
+
+# Append-only record of every ingested law list, one JSON line per file:
+# court, date, file, sha256, pages, bytes, mtime, status ('ok' or
+# 'quarantined'), error and ts. The latest line for a (court, file) wins.
+# Searches enumerate the archive from here instead of listing 121 folders,
+# and readers only parse the lines added since they last looked.
+MANIFEST = 'manifest.jsonl'
+
+# Corrupt or truncated PDFs are moved here (a dot-folder, so directory walks
+# skip it) and recorded as quarantined, so queries never trip over them
+QUARANTINE_DIR = '.quarantine'
+
+_lock = threading.Lock()
+# manifest path -> (bytes read, {(court, file): record})
+_cache = {}
+
+
+def manifest_path(root='data'):
+    return os.path.join(root, MANIFEST)
+
+
+def exists(root='data'):
+    return os.path.exists(manifest_path(root))
+
+
+def append(root, record):
+    line = json.dumps(record, sort_keys=True)
+    with _lock, open(manifest_path(root), 'a', encoding='utf-8') as f:
+        f.write(line + "\n")
+
+
+def read(root='data', offset=0):
+    """Return (records, offset) for the complete lines after byte offset.
+
+    A partially written last line is left for the next read.
+    """
+    try:
+        f = open(manifest_path(root), 'rb')
+    except FileNotFoundError:
+        return [], 0
+    with f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, offset + end
+
+
+def current(root='data'):
+    """{(court, file): latest record}, reading only lines new since the last call"""
+    path = os.path.abspath(manifest_path(root))
+    with _lock:
+        offset, records = _cache.get(path, (0, {}))
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            _cache.pop(path, None)
+            return {}
+        if size < offset:
+            # Rewritten or truncated: start over
+            offset, records = 0, {}
+        if size > offset:
+            new, offset = read(root, offset)
+            # Copy so dicts already handed out never change under the caller
+            records = dict(records)
+            for record in new:
+                records[(record['court'], record['file'])] = record
+        _cache[path] = (offset, records)
+        return records
+
+
+def in_range(file, since=None, until=None):
+    """Whether a YYYY-MM-DD.pdf name falls within the inclusive date range"""
+    date = file[:-len('.pdf')]
+    return (not since or date >= since) and (not until or date <= until)
+
+
+def iter_pdfs(root='data', courts=None, since=None, until=None):
+    """Yield (court, file) for every good PDF in the manifest.
+
+    courts (a collection of court folder names) and the inclusive
+    YYYY-MM-DD since/until dates prune the archive before anything is opened.
+    Falls back to walking root when there is no manifest yet, listing only
+    the chosen courts' folders.
+    """
+    if not exists(root):
+        if courts is None:
+            files = walk_pdfs(root)
+        else:
+            files = ((court, file) for court in courts if os.path.isdir(os.path.join(root, court))
+                     for file in court_pdfs(root, court))
+        for court, file in files:
+            if in_range(file, since, until):
+                yield court, file
+        return
+    for (court, file), record in current(root).items():
+        if record['status'] == 'ok' and (courts is None or court in courts) and in_range(file, since, until):
+            yield court, file
+
+
+def validate(pdf_path):
+    """Return the page count of pdf_path, or raise ValueError if it is not a whole PDF"""
+    with open(pdf_path, 'rb') as f:
+        head = f.read(5)
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        tail = f.read()
+    if head != b'%PDF-':
+        raise ValueError("not a PDF")
+    if b'%%EOF' not in tail:
+        raise ValueError("truncated PDF (no %%EOF marker)")
+    import PyPDF2
+    try:
+        pages = len(PyPDF2.PdfReader(pdf_path).pages)
+    except Exception as e:
+        raise ValueError(f"unreadable PDF: {e}") from e
+    if not pages:
+        raise ValueError("PDF has no pages")
+    return pages
+
+
+def quarantine(root, court, file):
+    """Move root/court/file into the quarantine folder and return its new path"""
+    dest_dir = os.path.join(root, QUARANTINE_DIR, court)
+    os.makedirs(dest_dir, exist_ok=True)
+    dest = os.path.join(dest_dir, file)
+    shutil.move(os.path.join(root, court, file), dest)
+    return dest
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize the ingest manifest")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--quarantined', action='store_true', help="list quarantined files and why")
+    args = parser.parse_args()
+
+    if not exists(args.root):
+        print(f"No manifest at {manifest_path(args.root)} yet; run court_scraper.py (or court_scraper.py --ingest).")
+    else:
+        records = current(args.root)
+        bad = sorted((r for r in records.values() if r['status'] != 'ok'), key=lambda r: (r['court'], r['file']))
+        ok = len(records) - len(bad)
+        print(f"📒 {ok} file(s) ingested, {len(bad)} quarantined, "
+              f"{sum(r['pages'] or 0 for r in records.values() if r['status'] == 'ok')} page(s)")
+        if args.quarantined:
+            for r in bad:
+                print(f"  {r['court']}/{r['file']}: {r['error']}")
@@ -0,0 +1,103 @@
+import os
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+import archive
+
+# Matched-page PDFs are built only when someone asks for them and kept in a
+# process-wide LRU bounded by total bytes, so every session shares them
+MAX_BYTES = 64 * 1024 * 1024
+
+# Previews are written here and served by Streamlit's static file serving
+# (server.enableStaticServing) at app/static/matches/<name>
+STATIC_DIR = os.path.join('static', 'matches')
+STATIC_URL = 'app/static/matches'
+MAX_STATIC_FILES = 200
+
+
+class LRUBytes:
+    """Thread-safe LRU mapping of keys to bytes, evicting past max_bytes in total"""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            if len(value) > self.max_bytes:
+                return
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+_cache = LRUBytes()
+
+
+def _key(pdf_path, pages):
+    # mtime is part of the key so a re-downloaded list never serves stale pages
+    return (os.path.abspath(pdf_path), archive.stat(pdf_path)[1], tuple(pages))
+
+
+def render(pdf_path, pages):
+    """Return the bytes of a PDF holding just the given 1-based pages.
+
+    Pages beyond the end of the document are skipped.
+    """
+    key = _key(pdf_path, pages)
+    data = _cache.get(key)
+    if data is None:
+        import PyPDF2
+        output = PyPDF2.PdfWriter()
+        with archive.open_pdf(pdf_path) as f:
+            reader = PyPDF2.PdfReader(f)
+            for page_num in pages:
+                if 1 <= page_num <= len(reader.pages):
+                    output.add_page(reader.pages[page_num - 1])
+            buffer = io.BytesIO()
+            output.write(buffer)
+        data = buffer.getvalue()
+        _cache.put(key, data)
+    return data
+
+
+def publish(pdf_path, pages, static_dir=STATIC_DIR):
+    """Write the matched pages into static_dir and return the file name.
+
+    Files are named by a hash of the cache key, so repeat requests reuse the
+    file already on disk. Only the newest MAX_STATIC_FILES are kept.
+    """
+    name = hashlib.sha1(repr(_key(pdf_path, pages)).encode('utf-8')).hexdigest()[:20] + '.pdf'
+    path = os.path.join(static_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(static_dir, exist_ok=True)
+        with open(path + '.part', 'wb') as f:
+            f.write(render(pdf_path, pages))
+        os.replace(path + '.part', path)
+        published = sorted(
+            (entry for entry in os.scandir(static_dir) if entry.name.endswith('.pdf')),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in published[:-MAX_STATIC_FILES]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    else:
+        os.utime(path)
+    return name
@@ -0,0 +1,282 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+# Lightweight counters and histograms for the hot paths (downloads, PDF
+# extraction, searches, NSW browser phases). Everything is opt-in through
+# the environment and costs a dict update per observation otherwise:
+#   METRICS_LOG=path      append one JSON line per timed event
+#   METRICS_FILE=path     write Prometheus text here (textfile collector)
+#   METRICS_PORT=port     serve Prometheus text at http://host:port/metrics
+#   METRICS_PROFILE=secs  cProfile + tracemalloc any profiled() block slower
+#                         than secs, saved under PROFILE_DIR
+PREFIX = 'courtlists_'
+LOG_PATH = os.environ.get('METRICS_LOG')
+PROM_PATH = os.environ.get('METRICS_FILE')
+PORT = os.environ.get('METRICS_PORT')
+PROFILE = os.environ.get('METRICS_PROFILE')
+PROFILE_DIR = os.path.join('cache', 'profiles')
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """Thread-safe counters and fixed-bucket histograms keyed by name and labels"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            # (name, labels) -> [count per bucket..., +Inf count, sum]
+            self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += value
+
+    def snapshot(self):
+        """Picklable copy, e.g. to send back from a worker process"""
+        with self._lock:
+            return {
+                'counters': [(n, l, v) for (n, l), v in self.counters.items()],
+                'histograms': [(n, l, list(h)) for (n, l), h in self.histograms.items()],
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                h = self.histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+                for i, v in enumerate(values):
+                    h[i] += v
+
+    def summary(self):
+        """{metric{labels}: value} for counters and {count, sum, mean} for histograms"""
+        def key(name, labels):
+            return name + ('{' + ','.join(f"{k}={v}" for k, v in labels) + '}' if labels else '')
+        with self._lock:
+            out = {key(n, l): v for (n, l), v in sorted(self.counters.items())}
+            for (n, l), h in sorted(self.histograms.items()):
+                out[key(n, l)] = {'count': h[-2], 'sum': round(h[-1], 6),
+                                  'mean': round(h[-1] / h[-2], 6) if h[-2] else None}
+        return out
+
+    def render(self):
+        """Prometheus text exposition format"""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            esc = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+            return '{' + ','.join(f'{k}="{v}"' for k, v in esc) + '}'
+
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}{name}{fmt(labels)} {value}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (n, labels), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    for bound, count in zip(self.buckets, h):
+                        lines.append(f"{PREFIX}{name}_bucket{fmt(labels, [('le', str(bound))])} {count}")
+                    lines.append(f"{PREFIX}{name}_bucket{fmt(labels, [('le', '+Inf')])} {h[-2]}")
+                    lines.append(f"{PREFIX}{name}_sum{fmt(labels)} {h[-1]}")
+                    lines.append(f"{PREFIX}{name}_count{fmt(labels)} {h[-2]}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+
+_log_lock = threading.Lock()
+
+
+def log(event, **fields):
+    """Append one structured JSON line to METRICS_LOG, if set"""
+    if not LOG_PATH:
+        return
+    record = json.dumps({'ts': round(time.time(), 3), 'event': event, 'pid': os.getpid(), **fields}, default=str)
+    with _log_lock, open(LOG_PATH, 'a', encoding='utf-8') as f:
+        f.write(record + "\n")
+
+
+@contextmanager
+def timer(name, **labels):
+    """Time the block into histogram name and log it.
+
+    Yields a dict; anything put in it (file names, hit counts...) goes into
+    the JSON log record only, keeping label cardinality low.
+    """
+    fields = {}
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(name, elapsed, **labels)
+        log(name, seconds=round(elapsed, 6), **labels, **fields)
+
+
+def flush(path=None):
+    """Write the Prometheus text to path (default METRICS_FILE), if any"""
+    path = path or PROM_PATH
+    if not path:
+        return
+    with open(path + '.part', 'w', encoding='utf-8') as f:
+        f.write(REGISTRY.render())
+    os.replace(path + '.part', path)
+
+
+atexit.register(flush)
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=None):
+    """Serve /metrics on port (default METRICS_PORT) from a background thread.
+
+    Safe to call on every Streamlit rerun: one server is started per process.
+    Returns the server, or None when no port is configured.
+    """
+    global _server
+    port = port or PORT
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = REGISTRY.render().encode('utf-8')
+                    self.send_response(200 if self.path.startswith('/metrics') else 404)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            _server = ThreadingHTTPServer(('0.0.0.0', int(port)), Handler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+# tracemalloc is process-wide: overlapping profiled() blocks (one per
+# session) share it, and it is stopped when the last one that needed it ends
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    import tracemalloc
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    # Returns (snapshot, peak bytes) taken while tracing is still on
+    global _tracing_users, _tracing_started
+    import tracemalloc
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+    return snapshot, peak
+
+
+@contextmanager
+def profiled(label, slow=None):
+    """Profile the block with cProfile and tracemalloc, keeping slow runs.
+
+    Off unless slow (seconds) is given or METRICS_PROFILE is set. When the
+    block takes at least that long, the cProfile stats are saved to
+    PROFILE_DIR/<label>-<time>.prof and the top allocation sites are logged.
+    """
+    threshold = slow if slow is not None else (float(PROFILE) if PROFILE else None)
+    if threshold is None:
+        yield
+        return
+    import cProfile
+    _start_tracing()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        snapshot, peak = _stop_tracing()
+        if elapsed >= threshold:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', label)[:60]
+            path = os.path.join(PROFILE_DIR, f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            profiler.dump_stats(path)
+            top = [str(stat) for stat in snapshot.statistics('lineno')[:10]] if snapshot else []
+            log('profile', label=label, seconds=round(elapsed, 6), peak_bytes=peak, stats=path, top_allocations=top)
+            print(f"🐢 {label} took {elapsed:.2f}s; profile saved to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize a METRICS_LOG file: count, mean and p95 per event")
+    parser.add_argument('log', help="JSON lines written via METRICS_LOG")
+    args = parser.parse_args()
+
+    by_event = {}
+    with open(args.log, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'seconds' in record:
+                by_event.setdefault(record['event'], []).append(record['seconds'])
+    for event, values in sorted(by_event.items()):
+        values.sort()
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"{event:30} n={len(values):6}  mean={sum(values) / len(values):.4f}s  p95={p95:.4f}s")
@@ -0,0 +1,132 @@
+import re
+import functools
+from metaphone import doublemetaphone
+
+# Approximate name lookup over the parties in the listings table: trigram
+# postings per name token plus Double Metaphone codes, so "SMITH, John",
+# "John Smith", "Smyth" and "Bruce Tonking" for "Bruce-Tonking" all find
+# each other without scanning every page
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS name_grams (gram TEXT NOT NULL, name_id INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS name_grams_gram ON name_grams (gram);
+CREATE TABLE IF NOT EXISTS name_phones (phone TEXT NOT NULL, name_id INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS name_phones_phone ON name_phones (phone);
+"""
+
+THRESHOLD = 0.8
+# Similarity credited to a token that only matches by sound: full credit for
+# matching primary codes, less when only an alternate pronunciation agrees
+PHONETIC_SCORE = 0.85
+ALTERNATE_SCORE = 0.5
+
+TITLES = {'mr', 'mrs', 'ms', 'miss', 'mx', 'dr', 'master'}
+
+
+def tokens(name):
+    """Casefolded name tokens with punctuation, hyphens and titles removed"""
+    words = re.findall(r"[^\W\d_]+", name.casefold().replace("'", ""))
+    return [w for w in words if w not in TITLES]
+
+
+def name_key(name):
+    """Order-insensitive key, so 'SMITH, John' and 'John Smith' are one name"""
+    return " ".join(sorted(tokens(name)))
+
+
+# Scoring a query compares its tokens with every candidate's, and the same
+# surnames and given names come up over and over, so per-token work is memoized
+TOKEN_CACHE = 65536
+
+
+@functools.lru_cache(maxsize=TOKEN_CACHE)
+def _grams(token):
+    padded = f" {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+_metaphone = functools.lru_cache(maxsize=TOKEN_CACHE)(doublemetaphone)
+
+
+def _phones(token):
+    return {code for code in _metaphone(token) if code}
+
+
+def _sound(q, n):
+    q_primary, q_alt = _metaphone(q)
+    n_primary, n_alt = _metaphone(n)
+    if q_primary and q_primary == n_primary:
+        return PHONETIC_SCORE
+    if {q_primary, q_alt} & {n_primary, n_alt} - {''}:
+        return ALTERNATE_SCORE
+    return 0.0
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def similarity(query, key):
+    """Score in [0, 1]: each query token's best match among the name's tokens, averaged"""
+    q_tokens, n_tokens = tokens(query), key.split()
+    if not q_tokens or not n_tokens:
+        return 0.0
+    total = 0.0
+    for q in q_tokens:
+        q_grams = _grams(q)
+        best = 0.0
+        for n in n_tokens:
+            score = 1.0 if q == n else max(_dice(q_grams, _grams(n)), _sound(q, n))
+            best = max(best, score)
+        total += best
+    return total / len(q_tokens)
+
+
+def add(conn, parties):
+    """Register any new party names. Call inside a transaction."""
+    for party in parties:
+        key = name_key(party)
+        if not key:
+            continue
+        cur = conn.execute("INSERT OR IGNORE INTO names (key) VALUES (?)", (key,))
+        if cur.rowcount != 1:
+            continue
+        name_id = cur.lastrowid
+        toks = key.split()
+        conn.executemany("INSERT INTO name_grams (gram, name_id) VALUES (?, ?)",
+                         [(g, name_id) for g in set().union(*map(_grams, toks))])
+        conn.executemany("INSERT INTO name_phones (phone, name_id) VALUES (?, ?)",
+                         [(p, name_id) for p in set().union(*map(_phones, toks))])
+
+
+def lookup(conn, query, threshold=THRESHOLD, limit=50):
+    """Return [(key, score)] for indexed names similar to query, best first"""
+    q_tokens = tokens(query)
+    if not q_tokens:
+        return []
+    grams = sorted(set().union(*map(_grams, q_tokens)))
+    phones = sorted(set().union(*map(_phones, q_tokens)))
+
+    # A name can only reach the threshold if it shares a reasonable share of
+    # the query's trigrams, or sounds like one of its tokens
+    min_shared = max(1, int(threshold * len(grams) / 2))
+    candidates = {row[0] for row in conn.execute(
+        f"SELECT name_id FROM name_grams WHERE gram IN ({','.join('?' * len(grams))})"
+        " GROUP BY name_id HAVING COUNT(*) >= ?", grams + [min_shared])}
+    if phones:
+        candidates.update(row[0] for row in conn.execute(
+            f"SELECT DISTINCT name_id FROM name_phones WHERE phone IN ({','.join('?' * len(phones))})", phones))
+
+    candidates = list(candidates)
+    scored = []
+    for i in range(0, len(candidates), 500):
+        chunk = candidates[i:i + 500]
+        for (key,) in conn.execute(f"SELECT key FROM names WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+            score = similarity(query, key)
+            if score >= threshold:
+                scored.append((key, score))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import nsw_scraper
+
+# NSW listings change a few times a day, so search results are kept on disk
+# for TTL seconds and shared by every process (both Streamlit apps, the CLI
+# and the prefetch job). The table is trimmed back to MAX_BYTES of stored
+# rows, least recently read first.
+CACHE_PATH = os.path.join('cache', 'nsw.sqlite')
+TTL = 4 * 3600
+MAX_BYTES = 32 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    term TEXT NOT NULL,
+    redacted INTEGER NOT NULL,
+    rows TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (term, redacted)
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+def connect(cache_path=CACHE_PATH):
+    if os.path.dirname(cache_path):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def term_key(term):
+    """'  SMITH ' and 'smith' share one entry, like the registry search"""
+    return " ".join(term.casefold().split())
+
+
+def get(conn, term, redact=nsw_scraper.REDACT_NAMES):
+    """Return (rows, fetched) for a cached term, or None"""
+    key = (term_key(term), int(redact))
+    with conn:
+        row = conn.execute("SELECT rows, fetched FROM results WHERE term = ? AND redacted = ?", key).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE results SET accessed = ? WHERE term = ? AND redacted = ?", (time.time(),) + key)
+    return json.loads(row[0]), row[1]
+
+
+def put(conn, term, rows, redact=nsw_scraper.REDACT_NAMES, max_bytes=MAX_BYTES):
+    """Store rows for term, evict the least recently read entries past max_bytes
+    and return the fetch time"""
+    data = json.dumps(rows)
+    now = time.time()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO results (term, redacted, rows, size, fetched, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            (term_key(term), int(redact), data, len(data), now, now),
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total > max_bytes:
+            keep, victims = total, []
+            for term_, redacted, size in conn.execute("SELECT term, redacted, size FROM results ORDER BY accessed"):
+                if keep <= max_bytes:
+                    break
+                victims.append((term_, redacted))
+                keep -= size
+            conn.executemany("DELETE FROM results WHERE term = ? AND redacted = ?", victims)
+    return now
+
+
+def search(term, backend=nsw_scraper.BACKEND, pool=None, redact=nsw_scraper.REDACT_NAMES,
+           ttl=TTL, refresh=False, cache_path=CACHE_PATH):
+    """Cached nsw_scraper.search(). Returns (rows, fetched, fresh).
+
+    A hit younger than ttl is returned as is. Otherwise the registry is
+    searched and the result stored; if that fails and an older entry exists,
+    it is returned with fresh=False instead of raising. refresh=True always
+    searches. rows is None when the browser found no result table (such
+    results are not cached).
+    """
+    with contextlib.closing(connect(cache_path)) as conn:
+        cached = get(conn, term, redact)
+        if cached and not refresh and time.time() - cached[1] < ttl:
+            metrics.inc('nsw_cache_total', result='fresh')
+            return cached[0], cached[1], True
+        metrics.inc('nsw_cache_total', result='refresh' if cached else 'miss')
+        try:
+            rows = nsw_scraper.search(term, backend, pool, redact)
+        except Exception as e:
+            if cached is None:
+                raise
+            print(f"⚠️ NSW search for '{term}' failed ({e}); serving the cached result", file=sys.stderr)
+            metrics.inc('nsw_cache_total', result='stale')
+            return cached[0], cached[1], False
+        if rows is None:
+            return None, time.time(), True
+        return rows, put(conn, term, rows, redact), True
+
+
+def age(fetched):
+    """'just now', '12 min ago', '3 h ago'"""
+    seconds = time.time() - fetched
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    return f"{int(seconds // 3600)} h ago"
+
+
+def prefetch(terms, backend=nsw_scraper.BACKEND, workers=2, ttl=TTL, cache_path=CACHE_PATH):
+    """Refresh every term whose entry is missing or past half its TTL.
+
+    Returns {term: 'cached' | 'refreshed' | 'failed'}.
+    """
+    with contextlib.closing(connect(cache_path)) as conn:
+        now = time.time()
+        fetched = {
+            (term_key(t), r): f for t, r, f in conn.execute("SELECT term, redacted, fetched FROM results")
+        }
+    redacted = int(nsw_scraper.REDACT_NAMES)
+    status = {}
+    due = []
+    for term in dict.fromkeys(terms):
+        if now - fetched.get((term_key(term), redacted), 0) < ttl / 2:
+            status[term] = 'cached'
+        else:
+            due.append(term)
+
+    pool = nsw_scraper.DriverPool(size=workers)
+
+    def refresh(term):
+        try:
+            rows, _, fresh = search(term, backend, pool, ttl=ttl, refresh=True, cache_path=cache_path)
+            return 'refreshed' if fresh and rows is not None else 'failed'
+        except Exception as e:
+            print(f"Failed to prefetch '{term}': {e}", file=sys.stderr)
+            return 'failed'
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            status.update(zip(due, executor.map(refresh, due)))
+    finally:
+        pool.close()
+    return status
+
+
+def load_terms(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Warm the NSW search cache from a list of terms")
+    parser.add_argument('terms', help="text file with one search term per line")
+    parser.add_argument('--backend', choices=nsw_scraper.BACKENDS, default=nsw_scraper.BACKEND)
+    parser.add_argument('--workers', type=int, default=2, help="searches run at once")
+    parser.add_argument('--ttl', type=int, default=TTL, help="seconds a result stays fresh")
+    parser.add_argument('--every', type=int, metavar='SECONDS', help="keep running, re-checking the list this often")
+    args = parser.parse_args()
+
+    while True:
+        status = prefetch(load_terms(args.terms), args.backend, args.workers, args.ttl)
+        counts = {s: list(status.values()).count(s) for s in ('refreshed', 'cached', 'failed')}
+        print(f"✅ {counts['refreshed']} refreshed, {counts['cached']} still fresh, {counts['failed']} failed")
+        if not args.every:
+            break
+        time.sleep(args.every)
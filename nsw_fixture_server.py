@@ -0,0 +1,91 @@
+import os
+import re
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import nsw_scraper
+
+# Offline stand-in for the NSW court-lists JSON endpoint. Responses recorded
+# with --record are replayed verbatim for the same term; any other term is
+# answered from every fixture's listings whose case title contains it.
+FIXTURE_DIR = os.path.join('fixtures', 'nsw')
+
+
+def _slug(term):
+    return re.sub(r'[^a-z0-9]+', '_', term.casefold()).strip('_') or 'empty'
+
+
+def record(terms, fixture_dir=FIXTURE_DIR, api_url=None):
+    """Save the live endpoint's response for each term under fixture_dir"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    for term in terms:
+        payload = nsw_scraper.fetch_json(term, api_url)
+        path = os.path.join(fixture_dir, f"{_slug(term)}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+        print(f"✅ Recorded '{term}' to {path}")
+
+
+def load(fixture_dir=FIXTURE_DIR):
+    """Return {slug: payload} for every fixture file"""
+    fixtures = {}
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.endswith('.json'):
+            with open(os.path.join(fixture_dir, name), encoding='utf-8') as f:
+                fixtures[name[:-len('.json')]] = json.load(f)
+    return fixtures
+
+
+def answer(fixtures, term):
+    if _slug(term) in fixtures:
+        return fixtures[_slug(term)]
+    needle = term.casefold()
+    results = [item for payload in fixtures.values() for item in nsw_scraper._items(payload)
+               if needle in str(item.get('caseTitle') or '').casefold()]
+    return {'results': results}
+
+
+def serve(port=8765, fixture_dir=FIXTURE_DIR):
+    """Start the stand-in server on a background thread and return it.
+
+    Point nsw_scraper at it with NSW_API_URL=http://127.0.0.1:<port>/search
+    (any path is accepted). Call shutdown() when done.
+    """
+    fixtures = load(fixture_dir)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            term = parse_qs(urlparse(self.path).query).get(nsw_scraper.API_PARAM, [''])[0]
+            body = json.dumps(answer(fixtures, term)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay recorded NSW court-list responses, or record new ones")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    parser.add_argument('--record', nargs='+', metavar='TERM', help="record the live responses for these terms and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.fixtures)
+    else:
+        server = serve(args.port, args.fixtures)
+        print(f"🧪 Serving {args.fixtures} at http://127.0.0.1:{args.port}/search (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
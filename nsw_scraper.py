@@ -0,0 +1,342 @@
+import os
+import re
+import sys
+import atexit
+import functools
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from contextlib import contextmanager
+import metrics
+
+# selenium (even its exceptions), webdriver_manager and BeautifulSoup are
+# imported by the browser backend when it is first used: the HTTP backend,
+# the search cache and a page that never searches NSW don't pay for them
+
+URL = "https://onlineregistry.lawlink.nsw.gov.au/content/court-lists#/"
+
+HEADERS = [
+    'Date', 'Time', 'Case Number', 'Case Title', 'Type', 'Court',
+    'Event', 'Presiding Officer', 'Location', 'Courtroom', 'Listing Number'
+]
+
+# The court-lists page is a single-page app that fetches its results as JSON.
+# The HTTP backend calls that endpoint directly; override NSW_API_URL to point
+# at another deployment or the fixture server (nsw_fixture_server.py). The
+# URL, query parameter and field names below have not yet been checked
+# against a captured request from the live page, so the HTTP backends stay
+# off until they are: set NSW_HTTP=1 to try them against a captured request
+# or the fixture server.
+API_URL = os.environ.get('NSW_API_URL', "https://onlineregistry.lawlink.nsw.gov.au/content/court-lists/api/search")
+API_PARAM = 'searchTerm'
+# JSON key for each of HEADERS, in order
+API_FIELDS = [
+    'listingDate', 'listingTime', 'caseNumber', 'caseTitle', 'caseType', 'court',
+    'event', 'presidingOfficer', 'location', 'courtroom', 'listingNumber'
+]
+HTTP_TIMEOUT = 15
+
+# 'selenium' renders the page in Chrome; with NSW_HTTP=1, 'http' calls the
+# JSON endpoint and 'auto' tries HTTP first and falls back to the browser
+HTTP_ENABLED = os.environ.get('NSW_HTTP') == '1'
+BACKENDS = ('auto', 'http', 'selenium') if HTTP_ENABLED else ('selenium',)
+BACKEND = os.environ.get('NSW_BACKEND', 'selenium')
+
+# Toggle name redaction
+REDACT_NAMES = True
+
+# Explicit waits replace the old fixed sleeps; these are upper bounds
+PAGE_TIMEOUT = 15
+RESULT_TIMEOUT = 10
+
+# What the page shows instead of a result table when nothing matches: a
+# leaf element reading "No results..." or "No records..."
+RESULT_ROWS = "table.resultTable tr"
+_TEXT = "translate(normalize-space(.), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+NO_RESULTS = f"//*[not(*)][starts-with({_TEXT}, 'no results') or starts-with({_TEXT}, 'no records')]"
+
+# Pool sizing: browsers are recycled after MAX_USES searches to cap memory growth
+POOL_SIZE = 2
+MAX_USES = 50
+
+
+_REDACTIONS = [
+    re.compile(r'(v\s+)([A-Z][A-Za-z\-\' ]+)'),
+    re.compile(r'([Ff]or\s+)([A-Z][A-Za-z\-\' ]+)'),
+]
+
+
+def redact_case_title(title: str) -> str:
+    """Redact names in case titles"""
+    for pattern in _REDACTIONS:
+        title = pattern.sub(r'\1[REDACTED]', title)
+    return title
+
+
+_local = threading.local()
+
+
+def _session():
+    # One keep-alive session per thread, like court_scraper
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Accept'] = 'application/json'
+        _local.session = session
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def driver_path():
+    """Resolve (and download if needed) the chromedriver binary once per process"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def preload():
+    """Import the browser backend and resolve chromedriver ahead of the first
+    browser search, e.g. from a background thread"""
+    import bs4  # noqa: F401
+    from selenium import webdriver  # noqa: F401
+    from selenium.webdriver.support.ui import WebDriverWait  # noqa: F401
+    driver_path()
+
+
+def new_driver(headless=True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(service=Service(driver_path()), options=options)
+
+
+class DriverPool:
+    """A bounded pool of long-lived Chrome drivers shared between callers.
+
+    acquire() hands out an idle driver (starting one if the pool is not full,
+    otherwise waiting). Drivers that fail a health check or have served
+    max_uses searches are quit and replaced.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_uses=MAX_USES, headless=True):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self._idle = []
+        self._uses = {}
+        self._live = 0
+        self._lock = threading.Condition()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _healthy(driver):
+        from selenium.common.exceptions import WebDriverException
+        try:
+            driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def _quit(self, driver):
+        from selenium.common.exceptions import WebDriverException
+        with self._lock:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    @contextmanager
+    def acquire(self):
+        from selenium.common.exceptions import WebDriverException
+        start = time.perf_counter()
+        with self._lock:
+            while not self._idle and self._live >= self.size:
+                self._lock.wait()
+            if self._idle:
+                driver = self._idle.pop()
+            else:
+                # Reserve the slot before the slow browser start
+                driver = None
+                self._live += 1
+        try:
+            if driver is not None and not self._healthy(driver):
+                self._quit(driver)
+                driver = None
+            if driver is None:
+                driver = new_driver(self.headless)
+                metrics.inc('nsw_driver_starts_total')
+                with self._lock:
+                    self._uses[driver] = 0
+        except Exception:
+            with self._lock:
+                self._live -= 1
+                self._lock.notify()
+            raise
+        metrics.observe('nsw_phase_seconds', time.perf_counter() - start, phase='acquire')
+
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            with self._lock:
+                self._uses[driver] = self._uses.get(driver, 0) + 1
+                retire = broken or self._uses[driver] >= self.max_uses
+                if retire:
+                    self._live -= 1
+                else:
+                    self._idle.append(driver)
+                self._lock.notify()
+            if retire:
+                self._quit(driver)
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._uses)
+            self._idle.clear()
+        for driver in drivers:
+            self._quit(driver)
+
+
+def _parse(page_source, redact=REDACT_NAMES):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page_source, "html.parser")
+    table = soup.find("table", class_="resultTable")
+    if table is None:
+        return None
+    results = []
+    for row in table.find_all("tr"):
+        cells = row.find_all(["td", "th"])
+        cell_text = [cell.get_text(strip=True) for cell in cells]
+        if cell_text:
+            if redact and len(cell_text) >= 4:
+                cell_text[3] = redact_case_title(cell_text[3])
+            results.append(cell_text)
+    return results
+
+
+def search_selenium(search_term, pool, redact=REDACT_NAMES):
+    """Run one court-list search in a pooled browser.
+
+    Returns the result table rows, [] as soon as the page says nothing
+    matched, or None when neither appeared within RESULT_TIMEOUT seconds.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    with pool.acquire() as driver:
+        # A blank page first forces a real reload of the single-page app,
+        # so a previous search's table can't be mistaken for this one's
+        with metrics.timer('nsw_phase_seconds', phase='load'):
+            driver.get("about:blank")
+            driver.get(URL)
+            search_box = WebDriverWait(driver, PAGE_TIMEOUT).until(
+                EC.element_to_be_clickable((By.ID, "searchInput"))
+            )
+        with metrics.timer('nsw_phase_seconds', phase='results') as t:
+            search_box.send_keys(search_term)
+            search_box.send_keys(Keys.RETURN)
+            try:
+                WebDriverWait(driver, RESULT_TIMEOUT).until(EC.any_of(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_ROWS)),
+                    EC.presence_of_element_located((By.XPATH, NO_RESULTS)),
+                ))
+            except TimeoutException:
+                t['timed_out'] = True
+                return None
+            if not driver.find_elements(By.CSS_SELECTOR, RESULT_ROWS):
+                t['empty'] = True
+                return []
+        with metrics.timer('nsw_phase_seconds', phase='parse'):
+            return _parse(driver.page_source, redact)
+
+
+def _items(payload):
+    # The list of listings, either bare or wrapped in an envelope object
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in ('results', 'data', 'items', 'listings'):
+            if isinstance(payload.get(key), list):
+                return payload[key]
+    raise ValueError("unrecognised court-list response")
+
+
+def to_rows(payload, redact=REDACT_NAMES):
+    """Map a court-list JSON response onto rows in HEADERS order.
+
+    Raises ValueError if a listing is not an object with every API_FIELDS
+    key (values may be null), so a changed response is never read as blank
+    rows.
+    """
+    results = []
+    for item in _items(payload):
+        if not isinstance(item, dict):
+            raise ValueError(f"unexpected court-list item {item!r:.80}")
+        missing = [key for key in API_FIELDS if key not in item]
+        if missing:
+            raise ValueError(f"court-list item lacks {', '.join(missing)}")
+        row = ['' if item.get(key) is None else str(item[key]).strip() for key in API_FIELDS]
+        if redact:
+            row[3] = redact_case_title(row[3])
+        results.append(row)
+    return results
+
+
+def fetch_json(search_term, api_url=None, timeout=HTTP_TIMEOUT):
+    """The raw JSON the court-lists page would receive for search_term"""
+    r = _session().get(api_url or API_URL, params={API_PARAM: search_term}, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def search_http(search_term, redact=REDACT_NAMES, api_url=None, timeout=HTTP_TIMEOUT):
+    """Run one court-list search without a browser. Returns the result rows.
+
+    Raises requests.RequestException or ValueError if the endpoint fails or
+    answers with something other than a list of listings.
+    """
+    with metrics.timer('nsw_phase_seconds', phase='http'):
+        payload = fetch_json(search_term, api_url, timeout)
+    with metrics.timer('nsw_phase_seconds', phase='parse'):
+        return to_rows(payload, redact)
+
+
+def search(search_term, backend=BACKEND, pool=None, redact=REDACT_NAMES):
+    """Search with the chosen backend; see BACKENDS.
+
+    pool is the DriverPool for the browser path (a private one-browser pool
+    is used and closed if none is given). Returns rows, or None when the
+    browser found no result table.
+    """
+    if backend not in BACKENDS:
+        if backend in ('auto', 'http'):
+            raise ValueError(f"the NSW {backend!r} backend is off until its endpoint is confirmed (NSW_HTTP=1)")
+        raise ValueError(f"unknown NSW backend {backend!r}")
+    if backend != 'selenium':
+        try:
+            return search_http(search_term, redact)
+        except (requests.RequestException, ValueError) as e:
+            if backend == 'http':
+                raise
+            print(f"⚠️ NSW HTTP backend failed ({e}); falling back to the browser", file=sys.stderr)
+            metrics.inc('nsw_fallbacks_total')
+    if pool is not None:
+        return search_selenium(search_term, pool, redact)
+    pool = DriverPool(size=1)
+    try:
+        return search_selenium(search_term, pool, redact)
+    finally:
+        pool.close()
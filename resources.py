@@ -0,0 +1,76 @@
+import sys
+import threading
+import streamlit as st
+
+# Process-wide state for the Streamlit apps. st.cache_resource builds each of
+# these once per server process and hands the same object to every session
+# and rerun; warm() and warm_nsw() start the slow ones in the background on
+# the first page load, before anyone has typed a name. Like the apps, they
+# import the QLD or NSW modules only when first called.
+
+def _update_index(root):
+    # warm() and refresh_index() may overlap with each other and with a
+    # search's cold build; search.update_index runs them one at a time
+    import search
+    import search_api
+    if search_api.URL:
+        # The search service keeps its own index current
+        return 0
+    return search.update_index(root)
+
+
+@st.cache_resource(show_spinner=False)
+def warm(root='data'):
+    """Start bringing the search index up to date in a background thread"""
+    thread = threading.Thread(target=_update_index, args=(root,), name='warm-index', daemon=True)
+    thread.start()
+    return thread
+
+
+# How often the index is refreshed; the apps' cached search results expire
+# on the same schedule so they never outlive the lists they were built from
+REFRESH_SECONDS = 3600
+
+
+# Pick up PDFs added since the index was last refreshed
+@st.cache_resource(ttl=REFRESH_SECONDS, show_spinner=False)
+def refresh_index(root='data'):
+    return _update_index(root)
+
+
+@st.cache_resource(show_spinner=False)
+def qld_search():
+    """search.py, or a client of the search service when SEARCH_API_URL is set"""
+    import search
+    import search_api
+    return search_api.Client() if search_api.URL else search
+
+
+@st.cache_resource(show_spinner=False)
+def regions():
+    """Region -> court folders from regions.json"""
+    import search
+    return search.load_regions()
+
+
+@st.cache_resource(show_spinner=False)
+def driver_pool():
+    """One pool of headless browsers, shared by every session"""
+    import nsw_scraper
+    return nsw_scraper.DriverPool()
+
+
+def _load_browser():
+    import nsw_scraper
+    try:
+        nsw_scraper.preload()
+    except Exception as e:
+        print(f"⚠️ Could not prepare the NSW browser backend: {e}", file=sys.stderr)
+
+
+@st.cache_resource(show_spinner=False)
+def warm_nsw():
+    """Import the browser stack and resolve chromedriver in the background"""
+    thread = threading.Thread(target=_load_browser, name='warm-nsw', daemon=True)
+    thread.start()
+    return thread
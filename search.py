@@ -1,35 +1,283 @@
 import os
-import PyPDF2
+import re
+import json
+import time
+import threading
+import contextlib
+import listings
+import metrics
+import name_index
+import search_index
+import text_store
+import watchlist
+from manifest import iter_pdfs
+from text_cache import load_pages, normalize
 
-def search_name(name, root='data'):
-    hits = []
-    for court in os.listdir(root):
-        court_path = os.path.join(root, court)
-        if not os.path.isdir(court_path):
+# Region name -> court folders, grouping the QLD courts geographically so a
+# search can be limited to one part of the state
+REGIONS_PATH = 'regions.json'
+
+# Index builds and updates in this process go one at a time; a query that
+# needs the complete index waits here for a build already under way
+_index_lock = threading.Lock()
+
+def _ensure_index(conn, root, errors=None, workers=1):
+    # Finish building the index before a query that can't fall back to a scan
+    if not search_index.is_complete(conn):
+        with _index_lock:
+            if not search_index.is_complete(conn):
+                search_index.update_index(conn, root, errors, workers)
+
+def load_regions(path=REGIONS_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def select_courts(courts=None, regions=None, path=REGIONS_PATH):
+    """Court folders named directly or through a region, or None for all courts"""
+    if not courts and not regions:
+        return None
+    selected = list(courts or [])
+    if regions:
+        known = load_regions(path)
+        for region in regions:
+            if region not in known:
+                raise ValueError(f"unknown region {region!r}; choose from {', '.join(known)}")
+            selected += known[region]
+    return sorted(set(selected))
+
+def search_pages(name, root='data', errors=None, index_path=search_index.INDEX_PATH, workers=1,
+                 courts=None, since=None, until=None):
+    """Return (court, file, page) for every page whose text contains name.
+
+    Queries go to the SQLite full-text index, which is built on first use and
+    kept current by court_scraper.py (or `python search_index.py`). Files that
+    fail to load while building are appended to errors as (path, exception)
+    when a list is given, otherwise printed. workers sets how many processes
+    extract text when the index has to be built. courts and the inclusive
+    YYYY-MM-DD since/until dates limit which lists are searched.
+    """
+    with metrics.timer('search_seconds', kind='pages') as t, \
+            contextlib.closing(search_index.connect(index_path)) as conn:
+        _ensure_index(conn, root, errors, workers)
+        hits = search_index.query(conn, name, courts, since, until)
+        t['hits'] = len(hits)
+    metrics.inc('search_hits_total', len(hits), kind='pages')
+    return hits
+
+def _scan(name, root, newest_first, deadline, errors, courts=None, since=None, until=None):
+    # Cold path for while the index is missing or half-built: walk the cached page text
+    # directly so the first hits arrive without waiting for a full build
+    needle = normalize(name)
+    files = sorted(iter_pdfs(root, courts, since, until))
+    with text_store.TextStore(text_store.store_dir_for(root)) as store:
+        # A store holding every list as it is now is scanned in place instead
+        if store.pages and store.covers(files, root):
+            wanted = set(files)
+            for hit in store.find(name, newest_first, courts, since, until):
+                if deadline and time.monotonic() > deadline:
+                    return
+                if hit[:2] in wanted:
+                    yield hit
+            return
+    if newest_first:
+        files.sort(key=lambda cf: cf[1], reverse=True)
+    for court, file in files:
+        if deadline and time.monotonic() > deadline:
+            return
+        file_path = os.path.join(root, court, file)
+        try:
+            pages = load_pages(file_path)
+        except Exception as e:
+            if errors is None:
+                print(f"Error reading {file}: {e}")
+            else:
+                errors.append((file_path, e))
             continue
-        for file in os.listdir(court_path):
-            if file.endswith('.pdf'):
-                try:
-                    with open(os.path.join(court_path, file), 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        text = " ".join(page.extract_text() or "" for page in reader.pages)
-                        if name.lower() in text.lower():
-                            hits.append((court, file))
-                except Exception as e:
-                    print(f"Error reading {file}: {e}")
+        for i, text in enumerate(pages):
+            if needle and needle in text:
+                yield court, file, i + 1
+
+def iter_hits(name, root='data', limit=None, timeout=None, newest_first=True, errors=None,
+              index_path=search_index.INDEX_PATH, courts=None, since=None, until=None):
+    """Yield (court, file, page) hits as they are found.
+
+    Hits come from the index once it is complete, otherwise (while it is
+    missing or still being built) from a scan of the text cache. newest_first orders by the date in the filename, so
+    limit=1 returns the latest appearance without touching older lists.
+    Iteration stops after limit hits or timeout seconds. courts and
+    since/until narrow the search as in search_pages.
+    """
+    started = time.monotonic()
+    deadline = started + timeout if timeout else None
+    count = 0
+    # Timed from the first request to the last hit handed out (or the caller
+    # giving up), so it includes the time the caller spends rendering
+    with contextlib.closing(search_index.connect(index_path)) as conn:
+        path = 'index' if search_index.is_complete(conn) else 'scan'
+        with metrics.timer('search_seconds', kind='stream', path=path) as t:
+            if path == 'scan':
+                hits = _scan(name, root, newest_first, deadline, errors, courts, since, until)
+            else:
+                hits = search_index.iter_query(conn, name, newest_first, courts, since, until)
+            try:
+                for hit in hits:
+                    count += 1
+                    if count == 1:
+                        metrics.observe('search_first_hit_seconds', time.monotonic() - started, path=path)
+                    yield hit
+                    if (limit and count >= limit) or (deadline and time.monotonic() > deadline):
+                        return
+            finally:
+                t['hits'] = count
+                metrics.inc('search_hits_total', count, kind='stream')
+
+def index_ready(index_path=search_index.INDEX_PATH):
+    """Whether the index is complete, so listing lookups won't build it first"""
+    with contextlib.closing(search_index.connect(index_path)) as conn:
+        return search_index.is_complete(conn)
+
+def update_index(root='data', errors=None, index_path=search_index.INDEX_PATH, workers=1):
+    """Bring the index and the flat text store up to date with the PDFs under root"""
+    with _index_lock, contextlib.closing(search_index.connect(index_path)) as conn:
+        updated = search_index.update_index(conn, root, errors, workers)
+    # Anything unreadable has just been reported by the index update
+    text_store.update(root, errors=[])
+    return updated
+
+def search_regex(pattern, root='data', newest_first=True, courts=None, since=None, until=None):
+    """Yield (court, file, page) for every page whose normalized text matches
+    the regular expression pattern, scanning the flat text store in place.
+
+    The text is casefolded with single spaces, so write patterns in lower case
+    (e.g. r"smith, j\w+"). Raises re.error for a bad pattern.
+    """
+    files = list(iter_pdfs(root, courts, since, until))
+    with metrics.timer('search_seconds', kind='regex') as t, \
+            text_store.TextStore(text_store.store_dir_for(root)) as store:
+        if not store.covers(files, root):
+            text_store.update(root)
+            store.reopen()
+        count = 0
+        for hit in store.match(pattern, newest_first, courts, since, until):
+            count += 1
+            yield hit
+        t['hits'] = count
+    metrics.inc('search_hits_total', count, kind='regex')
+
+def find_listings(name, root='data', exact=False, index_path=search_index.INDEX_PATH, **filters):
+    """Return parsed listing rows whose party matches name (see listings.find)"""
+    with contextlib.closing(search_index.connect(index_path)) as conn:
+        _ensure_index(conn, root)
+        return listings.find(conn, party=name, exact=exact, **filters)
+
+def fuzzy_search(name, threshold=name_index.THRESHOLD, root='data', index_path=search_index.INDEX_PATH, **filters):
+    """Return listing rows for parties that approximately match name, best first.
+
+    Each row dict gains a 'score' in [0, 1]; rows scoring under threshold are
+    dropped. Matching ignores word order, punctuation and titles and allows
+    misspellings and sound-alike surnames (see name_index).
+    """
+    with metrics.timer('search_seconds', kind='fuzzy') as t, \
+            contextlib.closing(search_index.connect(index_path)) as conn:
+        _ensure_index(conn, root)
+        rows = fuzzy_listings(conn, name, threshold, **filters)
+        t['hits'] = len(rows)
+    metrics.inc('search_hits_total', len(rows), kind='fuzzy')
+    return rows
+
+def fuzzy_listings(conn, name, threshold=name_index.THRESHOLD, **filters):
+    """fuzzy_search on an open index connection"""
+    scores = dict(name_index.lookup(conn, name, threshold))
+    rows = listings.find(conn, party_keys=list(scores), **filters) if scores else []
+    for row in rows:
+        row['score'] = scores[row['party_key']]
+    rows.sort(key=lambda row: -row['score'])
+    return rows
+
+def search_name(name, root='data', errors=None, workers=1, courts=None, since=None, until=None):
+    """Return (court, file) for every PDF that mentions name"""
+    hits = []
+    for court, file, _ in search_pages(name, root, errors, workers=workers, courts=courts, since=since, until=until):
+        if (court, file) not in hits[-1:]:
+            hits.append((court, file))
     return hits
 
 # Example usage:
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: python search.py <name>")
-    else:
-        name = sys.argv[1]
-        results = search_name(name)
-        if results:
-            print(f"Found '{name}' in the following files:")
-            for court, file in results:
-                print(f"{court}/{file}")
+    import argparse
+    parser = argparse.ArgumentParser(description="Search the downloaded law lists for a name")
+    parser.add_argument('name', nargs='?')
+    parser.add_argument('--reindex', action='store_true', help="pick up new or changed PDFs before searching")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="extraction processes when (re)indexing (default: one per core)")
+    parser.add_argument('--exact', action='store_true', help="match the listed party name exactly and show time and courtroom")
+    parser.add_argument('--fuzzy', action='store_true', help="approximate name match (order, spelling, sound-alikes), best first")
+    parser.add_argument('--threshold', type=float, default=name_index.THRESHOLD, help="minimum similarity for --fuzzy, 0-1")
+    parser.add_argument('--regex', action='store_true', help="treat name as a regular expression over the lower-cased page text")
+    parser.add_argument('--latest', action='store_true', help="only report the most recent list the name appears in")
+    parser.add_argument('--watchlist', metavar='FILE', help="check every name in FILE (one per line) in a single pass")
+    parser.add_argument('--date', help="with --watchlist, only scan lists dated YYYY-MM-DD")
+    parser.add_argument('--out', help="with --watchlist, write hits here (.csv or .jsonl) instead of stdout")
+    parser.add_argument('--court', action='append', help="only search this court folder (repeatable)")
+    parser.add_argument('--region', action='append', help=f"only search the courts in this region from {REGIONS_PATH} (repeatable)")
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help="only search lists dated on or after this day")
+    parser.add_argument('--until', metavar='YYYY-MM-DD', help="only search lists dated on or before this day")
+    args = parser.parse_args()
+    if not args.name and not args.watchlist:
+        parser.error("give a name to search for, or --watchlist FILE")
+    try:
+        courts = select_courts(args.court, args.region)
+    except ValueError as e:
+        parser.error(str(e))
+    scope = dict(courts=courts, since=args.since, until=args.until)
+
+    if args.reindex:
+        update_index(workers=args.workers)
+    if args.watchlist:
+        files = None
+        if courts or args.since or args.until:
+            files = [(court, file) for court, file in iter_pdfs('data', **scope)
+                     if args.date is None or file == f"{args.date}.pdf"]
+        hits = watchlist.scan(watchlist.load_names(args.watchlist), files=files, date=args.date)
+        fmt = 'jsonl' if args.out and args.out.endswith('.jsonl') else 'csv'
+        if args.out:
+            with open(args.out, 'w', newline='', encoding='utf-8') as f:
+                n = watchlist.write_hits(hits, f, fmt)
+            print(f"✅ {n} watchlist hit(s) written to {args.out}")
+        else:
+            watchlist.write_hits(hits, sys.stdout, fmt)
+        sys.exit()
+    name = args.name
+    if args.fuzzy:
+        rows = fuzzy_search(name, args.threshold, **scope)
+        if rows:
+            print(f"Found names like '{name}' in the following listings:")
+            for row in rows:
+                print(f"{row['score']:.2f}  {row['court']}/{row['date']}.pdf p.{row['page']}  {row['party']}")
         else:
-            print(f"No matches found for '{name}'.")
+            print(f"No listings found for names like '{name}'.")
+        sys.exit()
+    if args.exact:
+        rows = find_listings(name, exact=True, **scope)
+        if rows:
+            print(f"Found '{name}' in the following listings:")
+            for row in rows:
+                print(f"{row['court']}/{row['date']}.pdf p.{row['page']}  {row['time']}  courtroom {row['courtroom'] or '-'}  {row['party']}")
+        else:
+            print(f"No listings found for '{name}'.")
+        sys.exit()
+    if args.regex:
+        try:
+            results = list(dict.fromkeys((court, file) for court, file, _ in search_regex(name, **scope)))
+        except re.error as e:
+            parser.error(f"bad regular expression: {e}")
+    elif args.latest:
+        results = [(court, file) for court, file, _ in iter_hits(name, limit=1, **scope)]
+    else:
+        results = search_name(name, workers=args.workers, **scope)
+    if results:
+        print(f"Found '{name}' in the following files:")
+        for court, file in results:
+            print(f"{court}/{file}")
+    else:
+        print(f"No matches found for '{name}'.")
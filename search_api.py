@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import queue
+import itertools
+import threading
+import contextlib
+import collections
+import concurrent.futures
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import listings
+import metrics
+import name_index
+import search
+import search_index
+
+# Long-running HTTP/JSON front end to search.py. The index is brought up to
+# date once at startup and then shared: requests borrow one of a fixed pool of
+# read-only SQLite connections (memory-mapped, so every thread reads the same
+# pages from the OS cache), and answers are cached until the index changes.
+# A background thread picks up files added by court_scraper.py, or copied in
+# by hand, every RELOAD_SECONDS. The Streamlit apps talk to it through Client
+# when SEARCH_API_URL is set (e.g. http://127.0.0.1:8600).
+#
+#   GET /hits?name=smith&court=Cairns&region=Brisbane&since=2025-05-01&limit=1
+#   GET /listings?name=smith&exact=1        GET /fuzzy?name=jon+smyth&threshold=0.8
+#   GET /health
+URL = os.environ.get('SEARCH_API_URL')
+ENDPOINTS = ('/hits', '/listings', '/fuzzy', '/health')
+PORT = 8600
+POOL_SIZE = 16
+RELOAD_SECONDS = 15
+CACHE_SIZE = 2048
+CLIENT_TIMEOUT = 30
+
+# Let SQLite map up to this much of the index file instead of copying pages
+# into each connection's private cache
+MMAP_BYTES = 1 << 30
+
+
+class SearchService:
+    """The shared index, connection pool and result cache behind the server"""
+
+    def __init__(self, root='data', index_path=search_index.INDEX_PATH, pool_size=POOL_SIZE,
+                 cache_size=CACHE_SIZE, workers=1, courts=None):
+        self.root = root
+        self.index_path = index_path
+        # Only these court folders (one shard), or every court
+        self.courts = courts
+        self.workers = workers
+        self.cache_size = cache_size
+        self.generation = 0
+        self.reloaded = None
+        self._signature = None
+        self._cache = collections.OrderedDict()
+        # key -> Future of an answer being computed
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.reload()
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            conn = search_index.connect(index_path)
+            conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+            conn.execute("PRAGMA query_only = 1")
+            self._pool.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def reload(self):
+        """Index new or changed files; drop cached answers if anything changed"""
+        with self._reload_lock, metrics.timer('api_reload_seconds') as t, \
+                contextlib.closing(search_index.connect(self.index_path)) as conn:
+            errors = []
+            t['files'] = search_index.update_index(conn, self.root, errors, self.workers, self.courts)
+            for path, e in errors:
+                print(f"⚠️ Could not index {path}: {e}")
+            # The scraper indexes its downloads itself, so compare the file table
+            # rather than relying on what this update found
+            signature = conn.execute("SELECT count(*), coalesce(max(id), 0), total(mtime) FROM files").fetchone()
+        if signature != self._signature:
+            self._signature = signature
+            self.invalidate()
+        self.reloaded = time.time()
+        return t['files']
+
+    def invalidate(self):
+        """Forget every cached answer"""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    def watch(self, every=RELOAD_SECONDS):
+        """Reload every few seconds from a background thread until close()"""
+        def loop():
+            while not self._stop.wait(every):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Index reload failed: {e}")
+        thread = threading.Thread(target=loop, name='search-api-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        self._stop.set()
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    def cached(self, key, compute):
+        # Concurrent requests for the same uncached answer wait for the first
+        # one to compute it instead of all running the query
+        with self._lock:
+            key = (self.generation,) + key
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                metrics.inc('api_cache_total', result='hit')
+                return self._cache[key]
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = concurrent.futures.Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            metrics.inc('api_cache_total', result='wait')
+            return pending.result()
+        metrics.inc('api_cache_total', result='miss')
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            if key[0] == self.generation:
+                self._cache[key] = value
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        pending.set_result(value)
+        return value
+
+    def hits(self, name, limit=None, newest_first=True, courts=None, since=None, until=None):
+        def compute():
+            with self.connection() as conn:
+                hits = search_index.iter_query(conn, name, newest_first, courts, since, until)
+                return [list(hit) for hit in itertools.islice(hits, limit)]
+        key = ('hits', name, limit, newest_first, _key(courts), since, until)
+        return self.cached(key, compute)
+
+    def listings(self, name, exact=False, courts=None, since=None, until=None):
+        def compute():
+            with self.connection() as conn:
+                return listings.find(conn, party=name, exact=exact, courts=courts, since=since, until=until)
+        return self.cached(('listings', name, exact, _key(courts), since, until), compute)
+
+    def fuzzy(self, name, threshold=name_index.THRESHOLD, courts=None, since=None, until=None):
+        def compute():
+            with self.connection() as conn:
+                return search.fuzzy_listings(conn, name, threshold, courts=courts, since=since, until=until)
+        return self.cached(('fuzzy', name, threshold, _key(courts), since, until), compute)
+
+    def health(self):
+        with self.connection() as conn:
+            files, pages = conn.execute("SELECT count(*), total(pages) FROM files").fetchone()
+        return {'files': files, 'pages': int(pages), 'generation': self.generation,
+                'reloaded': self.reloaded, 'cached': len(self._cache)}
+
+
+def _key(courts):
+    return tuple(courts) if courts is not None else None
+
+
+def _scope(params):
+    # Query string -> courts/since/until keyword arguments
+    return dict(
+        courts=search.select_courts(params.get('court'), params.get('region')),
+        since=params.get('since', [None])[0],
+        until=params.get('until', [None])[0],
+    )
+
+
+def _flag(params, name):
+    return params.get(name, ['0'])[0].lower() in ('1', 'true', 'yes')
+
+
+def handle(service, path, params):
+    """Return the JSON-able answer for one request; raises KeyError or ValueError"""
+    if path == '/health':
+        return service.health()
+    if path not in ENDPOINTS:
+        raise KeyError(path)
+    name = params.get('name', [''])[0]
+    if not name.strip():
+        raise ValueError("missing name")
+    scope = _scope(params)
+    if path == '/hits':
+        limit = int(params['limit'][0]) if params.get('limit') else None
+        newest = _flag(params, 'newest') if 'newest' in params else True
+        return {'hits': service.hits(name, limit, newest, **scope)}
+    if path == '/listings':
+        return {'rows': service.listings(name, _flag(params, 'exact'), **scope)}
+    threshold = float(params.get('threshold', [name_index.THRESHOLD])[0])
+    return {'rows': service.fuzzy(name, threshold, **scope)}
+
+
+def serve(service, port=PORT, host='127.0.0.1'):
+    """Start the server on a background thread and return it (port 0 picks one).
+
+    Call shutdown() when done.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            endpoint = url.path if url.path in ENDPOINTS else 'other'
+            with metrics.timer('api_request_seconds', endpoint=endpoint) as t:
+                try:
+                    status, answer = 200, handle(service, url.path, urllib.parse.parse_qs(url.query))
+                except KeyError:
+                    status, answer = 404, {'error': f"no such endpoint {url.path}"}
+                except ValueError as e:
+                    status, answer = 400, {'error': str(e)}
+                except Exception as e:
+                    print(f"❌ {self.path}: {e!r}")
+                    status, answer = 500, {'error': repr(e)}
+                t['status'] = status
+                body = json.dumps(answer).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # The default listen backlog of 5 drops connections when dozens of
+        # users search at once, and each drop costs a 1s+ SYN retry
+        request_queue_size = 128
+        daemon_threads = True
+
+    server = Server((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Client:
+    """search.py's query functions, answered by a running search service.
+
+    root is accepted for compatibility and ignored: the service searches its
+    own archive. If the service can't be reached, the query runs locally.
+    """
+
+    def __init__(self, url=None, timeout=CLIENT_TIMEOUT):
+        self.url = (url or URL).rstrip('/')
+        self.timeout = timeout
+
+    def _get(self, path, **params):
+        query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None}, doseq=True)
+        with metrics.timer('api_client_seconds', endpoint=path):
+            with urllib.request.urlopen(f"{self.url}{path}?{query}", timeout=self.timeout) as r:
+                return json.load(r)
+
+    def _remote(self, path, local, **params):
+        try:
+            return self._get(path, **params)
+        except urllib.error.HTTPError:
+            raise
+        except OSError as e:
+            print(f"⚠️ Search service at {self.url} unavailable ({e}); searching locally")
+            metrics.inc('api_client_fallbacks_total')
+            return local()
+
+    def index_ready(self):
+        # The service builds its index before it starts answering
+        return True
+
+    def iter_hits(self, name, root='data', limit=None, timeout=None, newest_first=True, errors=None,
+                  courts=None, since=None, until=None):
+        local = lambda: {'hits': list(search.iter_hits(name, root, limit, timeout, newest_first, errors,
+                                                       courts=courts, since=since, until=until))}
+        answer = self._remote('/hits', local, name=name, limit=limit, newest=int(newest_first),
+                              court=courts, since=since, until=until)
+        for court, file, page in answer['hits']:
+            yield court, file, page
+
+    def search_pages(self, name, root='data', errors=None, courts=None, since=None, until=None):
+        return list(self.iter_hits(name, root, newest_first=False, errors=errors,
+                                   courts=courts, since=since, until=until))
+
+    def find_listings(self, name, root='data', exact=False, **filters):
+        local = lambda: {'rows': search.find_listings(name, root, exact, **filters)}
+        return self._remote('/listings', local, name=name, exact=int(exact), court=filters.get('courts'),
+                            since=filters.get('since'), until=filters.get('until'))['rows']
+
+    def fuzzy_search(self, name, threshold=name_index.THRESHOLD, root='data', **filters):
+        local = lambda: {'rows': search.fuzzy_search(name, threshold, root, **filters)}
+        return self._remote('/fuzzy', local, name=name, threshold=threshold, court=filters.get('courts'),
+                            since=filters.get('since'), until=filters.get('until'))['rows']
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve name, court and date searches over HTTP/JSON")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (0.0.0.0 for every interface)")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--pool', type=int, default=POOL_SIZE, help="index connections, i.e. queries answered at once")
+    parser.add_argument('--reload', type=float, default=RELOAD_SECONDS, help="seconds between checks for new lists")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="extraction processes when indexing")
+    args = parser.parse_args()
+
+    metrics.serve()  # Prometheus text on METRICS_PORT, when set
+    start = time.perf_counter()
+    service = SearchService(args.root, pool_size=args.pool, workers=args.workers)
+    health = service.health()
+    print(f"📚 Loaded {health['files']} list(s), {health['pages']} page(s) in {time.perf_counter() - start:.1f}s")
+    service.watch(args.reload)
+    server = serve(service, args.port, args.host)
+    print(f"🔎 Serving searches at http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        service.close()
@@ -0,0 +1,320 @@
+import os
+import json
+import sqlite3
+import archive
+import changelog
+import listings
+import manifest
+import name_index
+from text_cache import iter_pdfs, load_entry, load_many, normalize
+
+# SQLite FTS5 index over the cached page text, one row per (court, date, page)
+INDEX_PATH = os.path.join('cache', 'index.sqlite')
+
+# Page rows use rowid = file_id << PAGE_BITS | page so a file's rows can be
+# replaced with a rowid range delete instead of a full table scan
+PAGE_BITS = 16
+
+# Court/date-filtered queries read a slice of up to this many pages directly
+# by rowid range; bigger slices go through the trigram index and are filtered
+PRUNE_PAGES = 20000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    court TEXT NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    UNIQUE (court, file)
+);
+CREATE INDEX IF NOT EXISTS files_file ON files (file);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    court UNINDEXED, file UNINDEXED, page UNINDEXED, text,
+    tokenize = 'trigram'
+);
+""" + listings.SCHEMA + name_index.SCHEMA + changelog.SCHEMA
+
+# Bumped whenever a derived table changes, so existing indexes are rebuilt
+# from the text cache rather than left half-populated
+SCHEMA_VERSION = 4
+
+
+def connect(index_path=INDEX_PATH):
+    if os.path.dirname(index_path):
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    # Streaming searches may be finalized (and closed) from another thread
+    # than the one that opened them, e.g. between Streamlit reruns
+    conn = sqlite3.connect(index_path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        with conn:
+            # Dropping the FTS table drops its pages_* shadow tables with it
+            tables = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+                " AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'pages_%'")]
+            for table in tables:
+                conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def is_empty(conn):
+    return conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+
+def is_complete(conn):
+    """Whether a full update has finished, so queries see every list.
+
+    An index being built for the first time (or again after a schema or
+    court change) answers queries too, but only for the lists done so far.
+    """
+    return conn.execute("SELECT 1 FROM meta WHERE key = 'complete'").fetchone() is not None
+
+
+def _delete_file(conn, file_id):
+    lo = file_id << PAGE_BITS
+    conn.execute("DELETE FROM pages WHERE rowid BETWEEN ? AND ?", (lo, lo | ((1 << PAGE_BITS) - 1)))
+    conn.execute("DELETE FROM listings WHERE file_id = ?", (file_id,))
+    changelog.delete_file(conn, file_id)
+    conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+
+def remove_file(conn, court, file):
+    """Drop one PDF from the index, if it is there"""
+    row = conn.execute("SELECT id FROM files WHERE court = ? AND file = ?", (court, file)).fetchone()
+    if row:
+        with conn:
+            _delete_file(conn, row[0])
+
+
+def index_file(conn, root, court, file):
+    """Add or refresh one PDF in the index. Returns False if it was already current."""
+    size, mtime = archive.stat(os.path.join(root, court, file))
+    row = conn.execute(
+        "SELECT id, size, mtime FROM files WHERE court = ? AND file = ?", (court, file)
+    ).fetchone()
+    if row and row[1] == size and row[2] == mtime:
+        return False
+
+    entry = load_entry(os.path.join(root, court, file))
+    pages = entry['pages']
+    with conn:
+        if row:
+            _delete_file(conn, row[0])
+        cur = conn.execute(
+            "INSERT INTO files (court, file, size, mtime, pages) VALUES (?, ?, ?, ?, ?)",
+            (court, file, size, mtime, len(pages)),
+        )
+        base = cur.lastrowid << PAGE_BITS
+        conn.executemany(
+            "INSERT INTO pages (rowid, court, file, page, text) VALUES (?, ?, ?, ?, ?)",
+            [(base | (i + 1), court, file, i + 1, text) for i, text in enumerate(pages)],
+        )
+        rows = listings.store(conn, cur.lastrowid, court, file, entry['raw'])
+        name_index.add(conn, [row['party'] for row in rows])
+    return True
+
+
+def update_index(conn, root='data', errors=None, workers=1, courts=None):
+    """Index new or changed PDFs under root and drop ones that have gone.
+
+    With workers > 1 the text of the changed files is extracted on a process
+    pool first, so only the SQLite writes happen serially. Returns the number
+    of files (re)indexed. Files that fail to load are appended to errors as
+    (path, exception) when a list is given, otherwise printed.
+
+    Once root has an ingest manifest, only its new entries are considered
+    (see manifest.py); before that, root is walked. The day-over-day
+    changelog is brought up to date afterwards.
+
+    courts limits the index to those court folders (one shard of the
+    archive, see shards.py); lists from other courts are left out, or dropped
+    if the index held them before.
+
+    Files are committed one at a time, so the index is marked complete (see
+    is_complete) only once the first full update has finished.
+    """
+    courts = set(courts) if courts is not None else None
+    _set_courts(conn, courts)
+    if manifest.exists(root):
+        updated = _update_from_manifest(conn, root, errors, workers, courts)
+    else:
+        updated = _update_from_walk(conn, root, errors, workers, courts)
+    changelog.update(conn)
+    if not is_complete(conn):
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+    return updated
+
+
+def _set_courts(conn, courts):
+    # Record which courts the index holds; when that changes, drop the courts
+    # it no longer covers and re-read the manifest from the start for new ones
+    value = json.dumps(sorted(courts)) if courts is not None else None
+    row = conn.execute("SELECT value FROM meta WHERE key = 'courts'").fetchone()
+    if (row[0] if row else None) == value:
+        return
+    with conn:
+        if courts is not None:
+            for file_id, court in conn.execute("SELECT id, court FROM files").fetchall():
+                if court not in courts:
+                    _delete_file(conn, file_id)
+        conn.execute("DELETE FROM meta WHERE key IN ('courts', 'manifest_offset', 'complete')")
+        if value is not None:
+            conn.execute("INSERT INTO meta (key, value) VALUES ('courts', ?)", (value,))
+
+
+def _update_from_walk(conn, root, errors, workers, courts=None):
+    known = {(court, file): (size, mtime) for court, file, size, mtime in
+             conn.execute("SELECT court, file, size, mtime FROM files")}
+    seen = set()
+    pending = []
+    for court, file in iter_pdfs(root):
+        if courts is not None and court not in courts:
+            continue
+        seen.add((court, file))
+        try:
+            stamp = archive.stat(os.path.join(root, court, file))
+        except OSError:
+            continue
+        if known.get((court, file)) != stamp:
+            pending.append((court, file))
+
+    updated = _index_pending(conn, root, pending, errors, workers)[0]
+
+    stale = [r[0] for r in conn.execute("SELECT id, court, file FROM files") if (r[1], r[2]) not in seen]
+    with conn:
+        for file_id in stale:
+            _delete_file(conn, file_id)
+    return updated
+
+
+def _update_from_manifest(conn, root, errors, workers, courts=None):
+    # Only manifest lines written since the last update are read, so a daily
+    # refresh costs O(new files) rather than a stat of the whole archive
+    row = conn.execute("SELECT value FROM meta WHERE key = 'manifest_offset'").fetchone()
+    offset = int(row[0]) if row else 0
+    if offset > os.path.getsize(manifest.manifest_path(root)):
+        offset = 0
+    records, end = manifest.read(root, offset)
+    latest = {}
+    for record in records:
+        if courts is None or record['court'] in courts:
+            latest[(record['court'], record['file'])] = record
+
+    pending = []
+    for key, r in latest.items():
+        if r['status'] != 'ok':
+            remove_file(conn, *key)
+        elif conn.execute("SELECT size, mtime FROM files WHERE court = ? AND file = ?", key).fetchone() != (r['bytes'], r['mtime']):
+            pending.append(key)
+
+    updated, failures = _index_pending(conn, root, pending, errors, workers)
+    # Leave the offset where it was if anything failed, so it is retried
+    if not failures:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('manifest_offset', ?)", (str(end),))
+    return updated
+
+
+def _index_pending(conn, root, pending, errors, workers):
+    """Index pending (court, file) pairs; returns (files indexed, files that failed)"""
+    failed = set()
+    if workers != 1 and pending:
+        paths = [os.path.join(root, court, file) for court, file in pending]
+        failed = load_many(paths, workers=workers, errors=errors)
+
+    updated = 0
+    failures = len(failed)
+    for court, file in pending:
+        path = os.path.join(root, court, file)
+        if path in failed:
+            continue
+        try:
+            updated += index_file(conn, root, court, file)
+        except Exception as e:
+            failures += 1
+            if errors is None:
+                print(f"Error reading {file}: {e}")
+            else:
+                errors.append((path, e))
+    return updated, failures
+
+
+def _scope(courts=None, since=None, until=None):
+    # SQL conditions on court/file columns for a court list and date range
+    where, args = [], []
+    if courts is not None:
+        where.append(f"court IN ({','.join('?' * len(courts))})")
+        args.extend(courts)
+    if since:
+        where.append("file >= ?")
+        args.append(f"{since}.pdf")
+    if until:
+        where.append("file <= ?")
+        args.append(f"{until}.pdf")
+    return where, args
+
+
+def iter_query(conn, name, newest_first=False, courts=None, since=None, until=None):
+    """Yield (court, file, page) for every indexed page containing name.
+
+    Rows stream straight off the cursor. newest_first orders by the date in
+    the filename, latest first; otherwise rows come in index order. courts
+    and the inclusive YYYY-MM-DD since/until dates restrict the search; a
+    narrow slice is read file by file so the rest of the index is never
+    touched.
+    """
+    needle = normalize(name)
+    if not needle:
+        return
+    where, args = _scope(courts, since, until)
+    if where:
+        files = conn.execute(f"SELECT id, court, file, pages FROM files WHERE {' AND '.join(where)}", args).fetchall()
+        if sum(f[3] for f in files) <= PRUNE_PAGES:
+            if newest_first:
+                # Same order as the index query: file (date) descending, then court
+                files.sort(key=lambda f: f[1])
+                files.sort(key=lambda f: f[2], reverse=True)
+            else:
+                files.sort()
+            for file_id, court, file, _ in files:
+                lo = file_id << PAGE_BITS
+                for (page,) in conn.execute(
+                        "SELECT page FROM pages WHERE rowid BETWEEN ? AND ? AND instr(text, ?) > 0 ORDER BY rowid",
+                        (lo, lo | ((1 << PAGE_BITS) - 1), needle)):
+                    yield court, file, int(page)
+            return
+    if len(needle) >= 3:
+        # A quoted string is a substring match under the trigram tokenizer
+        sql = "SELECT court, file, page FROM pages WHERE text MATCH ?"
+        arg = '"' + needle.replace('"', '""') + '"'
+    else:
+        # Too short for trigrams, fall back to scanning the stored text
+        sql = "SELECT court, file, page FROM pages WHERE instr(text, ?) > 0"
+        arg = needle
+    for condition in where:
+        sql += " AND " + condition
+    sql += " ORDER BY file DESC, court, page" if newest_first else " ORDER BY rowid"
+    for court, file, page in conn.execute(sql, [arg] + args):
+        yield court, file, int(page)
+
+
+def query(conn, name, courts=None, since=None, until=None):
+    """Return (court, file, page) for every indexed page containing name"""
+    return list(iter_query(conn, name, courts=courts, since=since, until=until))
+
+
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    parser = argparse.ArgumentParser(description="Bring the full-text index up to date with data/")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="extraction processes (default: one per core)")
+    args = parser.parse_args()
+    with contextlib.closing(connect()) as conn:
+        n = update_index(conn, workers=args.workers)
+    print(f"✅ Indexed {n} new or changed file(s) into {INDEX_PATH}")
@@ -0,0 +1,256 @@
+import os
+import re
+import sys
+import json
+import time
+import itertools
+import threading
+import concurrent.futures
+import urllib.error
+import urllib.parse
+import urllib.request
+import metrics
+import search
+import search_api
+
+# Court-sharded search: the archive is split into shards by court group (a
+# region from regions.json) or single court, each indexed into its own
+# cache/shards/<shard>.sqlite and served by its own search_api worker process,
+# on this machine or another. A Coordinator answers the same HTTP/JSON API as
+# search_api.py by sending each query to the shards that hold the courts it
+# asks about, then merging their answers in the order one index would give.
+# A shard that is down, or slower than SHARD_TIMEOUT, is left out of that
+# answer (and reported by /health) rather than failing it. Shards index and
+# reload independently, so rebuilding one never blocks the others, and a
+# shard listed with several worker URLs spreads its queries across them.
+#
+# shards.json maps each shard to its worker URLs:
+#   {"Brisbane": ["http://10.0.0.5:8601", "http://10.0.0.6:8601"], "Cairns": ["http://10.0.0.7:8601"]}
+SHARDS_PATH = 'shards.json'
+SHARD_DIR = os.path.join('cache', 'shards')
+BASE_PORT = 8601
+SHARD_TIMEOUT = 5
+
+# Per-worker index connections; a host runs several workers
+WORKER_POOL_SIZE = 4
+
+
+def shard_courts(shard, regions=None):
+    """Court folders in a shard: a region's courts, or a single court"""
+    regions = search.load_regions() if regions is None else regions
+    return sorted(regions.get(shard, [shard]))
+
+
+def index_path(shard):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', shard).strip('_')
+    return os.path.join(SHARD_DIR, f"{slug}.sqlite")
+
+
+def load_shards(path=SHARDS_PATH):
+    """{shard: [worker URL]} from shards.json"""
+    with open(path, encoding='utf-8') as f:
+        return {shard: [urls] if isinstance(urls, str) else list(urls) for shard, urls in json.load(f).items()}
+
+
+def local_shards(regions=None, host='127.0.0.1', base_port=BASE_PORT):
+    """One shard per region, on consecutive ports of this machine"""
+    regions = search.load_regions() if regions is None else regions
+    return {shard: [f"http://{host}:{base_port + i}"] for i, shard in enumerate(regions)}
+
+
+def worker(shard, root='data', regions=None, pool_size=WORKER_POOL_SIZE, workers=1):
+    """A search_api.SearchService over one shard's courts and index"""
+    return search_api.SearchService(root, index_path(shard), pool_size, workers=workers,
+                                    courts=shard_courts(shard, regions))
+
+
+class Coordinator:
+    """search_api.SearchService's query methods, answered by scatter-gather
+    over shard workers. Serve it with search_api.serve()."""
+
+    def __init__(self, shards, regions=None, timeout=SHARD_TIMEOUT):
+        self.shards = {shard: [url.rstrip('/') for url in urls] for shard, urls in shards.items()}
+        self.timeout = timeout
+        self._owner = {court: shard for shard in self.shards for court in shard_courts(shard, regions)}
+        self._turn = itertools.count()
+        self._executor = concurrent.futures.ThreadPoolExecutor(4 * len(self.shards) or 1, thread_name_prefix='shard')
+        self._lock = threading.Lock()
+        # shard -> (time, error) of its last failure, cleared when it answers
+        self.failures = {}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _targets(self, courts):
+        if courts is None:
+            return list(self.shards)
+        return sorted({self._owner[court] for court in courts if court in self._owner})
+
+    def _call(self, shard, path, params, deadline):
+        # Replicas are tried in turn, starting from a different one each call,
+        # each with an even share of the time left before deadline, so a hung
+        # replica still leaves the next one time to answer; 4xx errors are the
+        # query's fault, not the shard's, and are raised
+        urls = self.shards[shard]
+        start = next(self._turn) % len(urls)
+        query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None}, doseq=True)
+        error = None
+        replicas = urls[start:] + urls[:start]
+        for i, url in enumerate(replicas):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                with metrics.timer('shard_request_seconds', shard=shard, endpoint=path):
+                    with urllib.request.urlopen(f"{url}{path}?{query}", timeout=remaining / (len(replicas) - i)) as r:
+                        return json.load(r)
+            except urllib.error.HTTPError as e:
+                if e.code < 500:
+                    raise ValueError(json.load(e).get('error', str(e))) from e
+                error = e
+            except OSError as e:
+                error = e
+        raise error or TimeoutError(f"no answer within {self.timeout}s")
+
+    def _gather(self, path, courts=None, **params):
+        # Answers from every shard holding one of courts that replies in time
+        targets = self._targets(courts)
+        if courts is not None:
+            params['court'] = list(courts)
+        deadline = time.monotonic() + self.timeout
+        futures = {self._executor.submit(self._call, shard, path, params, deadline): shard for shard in targets}
+        done, late = concurrent.futures.wait(futures, self.timeout)
+        answers = []
+        for future, shard in futures.items():
+            if future in late:
+                self._failed(shard, f"no answer within {self.timeout}s")
+                continue
+            try:
+                answers.append(future.result())
+            except ValueError:
+                raise
+            except Exception as e:
+                self._failed(shard, e)
+                continue
+            with self._lock:
+                self.failures.pop(shard, None)
+        if targets and not answers:
+            raise RuntimeError(f"no shard answered {path}")
+        return answers
+
+    def _failed(self, shard, error):
+        print(f"⚠️ Shard {shard} left out: {error}")
+        metrics.inc('shard_failures_total', shard=shard)
+        with self._lock:
+            self.failures[shard] = (time.time(), str(error))
+
+    def hits(self, name, limit=None, newest_first=True, courts=None, since=None, until=None):
+        # Each shard's first limit hits hold the merged first limit
+        hits = [tuple(hit) for answer in self._gather('/hits', courts, name=name, limit=limit, newest=int(newest_first),
+                                                     since=since, until=until) for hit in answer['hits']]
+        if newest_first:
+            # One index's order: date descending, then court and page
+            hits.sort(key=lambda hit: (hit[0], hit[2]))
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+        else:
+            hits.sort()
+        return [list(hit) for hit in hits[:limit]]
+
+    def listings(self, name, exact=False, courts=None, since=None, until=None):
+        rows = [row for answer in self._gather('/listings', courts, name=name, exact=int(exact), since=since, until=until)
+                for row in answer['rows']]
+        rows.sort(key=_listing_order)
+        return rows
+
+    def fuzzy(self, name, threshold=None, courts=None, since=None, until=None):
+        rows = [row for answer in self._gather('/fuzzy', courts, name=name, threshold=threshold, since=since, until=until)
+                for row in answer['rows']]
+        rows.sort(key=lambda row: (-row['score'],) + _listing_order(row))
+        return rows
+
+    def health(self):
+        shards = {}
+        deadline = time.monotonic() + self.timeout
+        futures = {shard: self._executor.submit(self._call, shard, '/health', {}, deadline) for shard in self.shards}
+        concurrent.futures.wait(futures.values(), self.timeout)
+        for shard, future in futures.items():
+            try:
+                shards[shard] = future.result(timeout=0)
+            except Exception as e:
+                shards[shard] = {'error': str(e) or f"no answer within {self.timeout}s"}
+        up = [h for h in shards.values() if 'error' not in h]
+        return {'files': sum(h['files'] for h in up), 'pages': sum(h['pages'] for h in up),
+                'shards': shards, 'up': len(up), 'down': len(shards) - len(up),
+                'failures': {shard: {'at': at, 'error': error} for shard, (at, error) in self.failures.items()}}
+
+
+def _listing_order(row):
+    # listings.find's ORDER BY
+    return row['date'], row['court'], row['time'] or '', row['party']
+
+
+def launch(shards, root='data', workers=1):
+    """Start a local worker process for each shard served from this machine.
+    Returns the processes."""
+    import subprocess
+    processes = []
+    for shard, urls in shards.items():
+        for url in urls:
+            parts = urllib.parse.urlparse(url)
+            if parts.hostname not in ('127.0.0.1', 'localhost'):
+                continue
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--worker', shard, '--port', str(parts.port),
+                 '--root', root, '--workers', str(workers)]))
+    return processes
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve a court-sharded search: one worker per shard and a coordinator")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (0.0.0.0 for every interface)")
+    parser.add_argument('--port', type=int, help=f"port (default: {search_api.PORT} for the coordinator)")
+    parser.add_argument('--worker', metavar='SHARD', help="serve this shard (a region or court folder) instead of coordinating")
+    parser.add_argument('--shards', default=SHARDS_PATH, help="shard -> worker URLs (default: one local worker per region)")
+    parser.add_argument('--local', action='store_true', help="also start the workers for shards on this machine")
+    parser.add_argument('--timeout', type=float, default=SHARD_TIMEOUT, help="seconds to wait for each shard")
+    parser.add_argument('--reload', type=float, default=search_api.RELOAD_SECONDS, help="seconds between checks for new lists")
+    parser.add_argument('--workers', type=int, default=1, help="extraction processes per worker when indexing")
+    parser.add_argument('--list', action='store_true', help="print the shards and their courts")
+    args = parser.parse_args()
+
+    shards = load_shards(args.shards) if os.path.exists(args.shards) else local_shards()
+    if args.list:
+        for shard, urls in shards.items():
+            print(f"{shard}: {len(shard_courts(shard))} court(s) at {', '.join(urls)}")
+        sys.exit()
+
+    metrics.serve()  # Prometheus text on METRICS_PORT, when set
+    if args.worker:
+        if args.worker not in shards:
+            parser.error(f"unknown shard {args.worker!r}; choose from {', '.join(shards)}")
+        start = time.perf_counter()
+        service = worker(args.worker, args.root, workers=args.workers)
+        health = service.health()
+        print(f"📚 Shard {args.worker}: {health['files']} list(s), {health['pages']} page(s) "
+              f"in {time.perf_counter() - start:.1f}s")
+        service.watch(args.reload)
+        port = args.port or urllib.parse.urlparse(shards[args.worker][0]).port
+        server = search_api.serve(service, port, args.host)
+        print(f"🔎 Serving shard {args.worker} at http://{args.host}:{port}")
+        processes = []
+    else:
+        processes = launch(shards, args.root, args.workers) if args.local else []
+        service = Coordinator(shards, timeout=args.timeout)
+        port = args.port or search_api.PORT
+        server = search_api.serve(service, port, args.host)
+        print(f"🔀 Coordinating {len(shards)} shard(s) at http://{args.host}:{port}"
+              + (f" ({len(processes)} local worker(s) starting)" if processes else ""))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        service.close()
+        for process in processes:
+            process.terminate()
@@ -1,7 +1,12 @@
 import os
-import io
-import base64
-import PyPDF2
+import functools
+import itertools
+import search
+import metrics
+import export
+import name_index
+import matched_pages
+import resources
 import streamlit as st
 
 # Page config
@@ -10,6 +15,8 @@ st.set_page_config(
     page_icon="⚖️",
     layout="centered",
 )
+metrics.serve()  # Prometheus text on METRICS_PORT, when set
+resources.warm()  # index refresh starts while the user is still typing
 
 st.markdown(
     """
@@ -44,79 +51,107 @@ st.markdown(
 st.markdown("# ⚖️ Daily Court List Search")
 st.markdown("#### 🔍 Enter a name to scan across downloaded court PDFs")
 name = st.text_input("Name to search", placeholder="e.g. John Smith")
+fuzzy = st.checkbox("Fuzzy match (spelling, word order, sound-alike surnames)")
+threshold = st.slider("Similarity threshold", 0.5, 1.0, name_index.THRESHOLD, 0.05, disabled=not fuzzy)
+latest_only = st.checkbox("Latest appearance only")
 
-@st.cache_data(show_spinner=False)
-def search_name(name, root='data'):
-    hits = []
-    for court in os.listdir(root):
-        court_path = os.path.join(root, court)
-        if not os.path.isdir(court_path):
-            continue
-        for file in os.listdir(court_path):
-            if file.endswith('.pdf'):
-                file_path = os.path.join(court_path, file)
-                try:
-                    with open(file_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        for i, page in enumerate(reader.pages):
-                            text = page.extract_text() or ""
-                            if name.lower() in text.lower():
-                                hits.append((court, file, i + 1))
-                except Exception as e:
-                    st.error(f"❌ Error reading {file_path}: {e}")
-    return hits
+# Narrowing the search to some courts or dates skips the rest of the archive
+# Answered by the search service when SEARCH_API_URL is set
+qld = resources.qld_search()
+regions = resources.regions()
+with st.expander("🗺️ Filter by region, court or date"):
+    chosen_regions = st.multiselect("Regions", list(regions))
+    chosen_courts = st.multiselect("Courts", sorted(c for courts in regions.values() for c in courts))
+    since = st.date_input("From", value=None)
+    until = st.date_input("To", value=None)
+courts = search.select_courts(chosen_courts, chosen_regions)
+since = since.isoformat() if since else None
+until = until.isoformat() if until else None
 
-def extract_pages(pdf_path, page_numbers):
-    output = PyPDF2.PdfWriter()
-    with open(pdf_path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for page_num in page_numbers:
-            try:
-                output.add_page(reader.pages[page_num - 1])
-            except IndexError:
-                st.warning(f"⚠️ Page {page_num} not found in {pdf_path}")
-    buffer = io.BytesIO()
-    output.write(buffer)
-    buffer.seek(0)
-    return buffer
+@st.cache_data(ttl=resources.REFRESH_SECONDS, show_spinner=False)
+def listing_rows(name, courts=None, since=None, until=None, root='data'):
+    grouped = {}
+    for row in qld.find_listings(name, root, courts=courts, since=since, until=until):
+        grouped.setdefault((row['court'], f"{row['date']}.pdf"), []).append(row)
+    return grouped
 
-def display_pdf_link(file_bytes, filename="preview.pdf"):
-    base64_pdf = base64.b64encode(file_bytes.read()).decode("utf-8")
-    href = f'<a href="data:application/pdf;base64,{base64_pdf}" target="_blank">📄 Open preview in new tab</a>'
-    st.markdown(href, unsafe_allow_html=True)
+@st.cache_data(ttl=resources.REFRESH_SECONDS, show_spinner=False)
+def fuzzy_rows(name, threshold, courts=None, since=None, until=None, root='data'):
+    return qld.fuzzy_search(name, threshold, root, courts=courts, since=since, until=until)
 
-# -- Search logic
-if name:
-    with st.spinner("🕵️‍♂️ Searching... please wait."):
-        results = search_name(name)
+def show_matches(court, file, pages, rows):
+    st.markdown("---")
+    st.markdown(f"#### 📂 `{court}` — `{file}`")
+    st.markdown(f"**🧾 Matching Pages:** `{', '.join(map(str, pages))}`")
+    for row in rows:
+        score = f" · similarity `{row['score']:.2f}`" if 'score' in row else ""
+        st.markdown(f"🕘 `{row['time']}` · Courtroom `{row['courtroom'] or '-'}` · {row['party']}{score}")
 
-    if results:
-        st.success(f"✅ Found `{name}` in {len(results)} page(s):")
+    # The PDF is only built when the button is clicked, and is cached per (file, pages)
+    pdf_path = os.path.join('data', court, file)
+    st.download_button(
+        label="⬇️ Download matched pages",
+        data=functools.partial(matched_pages.render, pdf_path, tuple(pages)),
+        file_name=f"{court}_{file.replace('.pdf', '')}_matches.pdf",
+        mime="application/pdf",
+        key=f"download_{court}_{file}",
+        on_click="ignore",
+    )
+    if st.button("📄 Preview matched pages", key=f"preview_{court}_{file}"):
+        preview = matched_pages.publish(pdf_path, pages)
+        st.markdown(f'<a href="{matched_pages.STATIC_URL}/{preview}" target="_blank">📄 Open preview in new tab</a>', unsafe_allow_html=True)
 
-        grouped = {}
-        for court, file, page in results:
-            key = (court, file)
-            grouped.setdefault(key, []).append(page)
-
-        for (court, file), pages in grouped.items():
-            st.markdown("---")
-            st.markdown(f"#### 📂 `{court}` — `{file}`")
-            st.markdown(f"**🧾 Matching Pages:** `{', '.join(map(str, pages))}`")
+# -- Search logic
+if name:
+    summary = st.empty()
+    summary.info("🕵️‍♂️ Searching... please wait.")
+    # Opt-in profiling of slow queries (METRICS_PROFILE)
+    with metrics.profiled('qld-search'):
+        errors = []
+        if fuzzy:
+            matches = fuzzy_rows(name, threshold, courts, since, until)
+            rows = {}
+            for row in matches:
+                rows.setdefault((row['court'], f"{row['date']}.pdf"), []).append(row)
+            hits = [(court, file, row['page']) for (court, file), group in rows.items()
+                    for row in group]
+        else:
+            # Hits stream in newest first and each file is shown as soon as its
+            # pages are in, rather than after the whole archive has been searched
+            hits = qld.iter_hits(name, errors=errors, courts=courts, since=since, until=until)
+            # Listing rows come from the index; while it is still being built
+            # the hits are scanned instead and shown without them, rather
+            # than waiting for the whole build before the first file
+            rows = listing_rows(name, courts, since, until) if qld.index_ready() else {}
 
-            pdf_path = os.path.join('data', court, file)
-            combined_pdf = extract_pages(pdf_path, pages)
+        found = []
+        for (court, file), group in itertools.groupby(hits, key=lambda hit: hit[:2]):
+            pages = sorted({page for _, _, page in group})
+            found.extend((court, file, page) for page in pages)
+            show_matches(court, file, pages, rows.get((court, file), []))
+            if latest_only:
+                break
+    for file_path, e in errors:
+        st.error(f"❌ Error reading {file_path}: {e}")
 
-            st.download_button(
-                label="⬇️ Download matched pages",
-                data=combined_pdf,
-                file_name=f"{court}_{file.replace('.pdf', '')}_matches.pdf",
-                mime="application/pdf"
+    if found:
+        summary.success(f"✅ Found `{name}` in {len(found)} page(s):")
+        # Export the hit list itself (court, date, page) in any format
+        st.markdown("---")
+        hit_table = list(export.hit_rows(found))
+        for col, fmt in zip(st.columns(len(export.formats())), export.formats()):
+            mime, label = export.FORMATS[fmt]
+            col.download_button(
+                label=f"⬇️ Hits as {label}",
+                data=functools.partial(export.to_bytes, fmt, export.HIT_HEADERS, hit_table),
+                file_name=f"qld_hits_{name.lower()}.{fmt}",
+                mime=mime,
+                key=f"hits_{fmt}",
+                on_click="ignore",
             )
-
-            combined_pdf.seek(0)
-            display_pdf_link(combined_pdf)
-
     else:
-        st.warning(f"🚫 No matches found for `{name}`.")
+        summary.warning(f"🚫 No matches found for `{name}`.")
+    resources.refresh_index()
+    metrics.flush()
 else:
     st.info("👈 Enter a name above to start searching.")
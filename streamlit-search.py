@@ -1,18 +1,9 @@
 import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from openpyxl import Workbook
-import csv
-import time
 import os
-import re
-import io
-import base64
-import PyPDF2
+import functools
+import metrics
+import export
+import resources
 
 # --- Styling ---
 custom_css = """
@@ -44,6 +35,7 @@ custom_css = """
 
 # --- Page Config ---
 st.set_page_config(page_title="Court Listings Scraper", layout="wide")
+metrics.serve()  # Prometheus text on METRICS_PORT, when set
 
 # --- Apply Custom CSS ---
 st.markdown(custom_css, unsafe_allow_html=True)
@@ -54,26 +46,24 @@ st.title("⚖️ Court Listings Scraper")
 # --- Region Selection ---
 region = st.radio(
     "Select Region:",
-    options=["NSW", "QLD"],
+    options=["NSW", "QLD", "All regions"],
     horizontal=True
 )
 
 # --- NSW Functionality ---
+# Each region's modules are imported only once its tab is opened, so a QLD
+# search never loads the NSW browser stack (and vice versa)
 if region == "NSW":
+    import nsw_scraper
+    import nsw_cache
     st.markdown("### NSW Court Listings Search")
 
-    # Toggle name redaction
-    REDACT_NAMES = True
-
-    # Function to redact case title
-    def redact_case_title(title: str) -> str:
-        """Redact names in case titles"""
-        redacted = re.sub(r'(v\s+)([A-Z][A-Za-z\-\' ]+)', r'\1[REDACTED]', title)
-        redacted = re.sub(r'([Ff]or\s+)([A-Z][A-Za-z\-\' ]+)', r'\1[REDACTED]', redacted)
-        return redacted
-
     # User input for search term
     search_term = st.text_input("Search Term (e.g., Smith):").strip()
+    backend = nsw_scraper.BACKEND
+
+    if backend == 'selenium':
+        resources.warm_nsw()
 
     # Styling for colored output
     def colored_text(text, color):
@@ -82,110 +72,60 @@ if region == "NSW":
     if search_term:
         st.write(f"Searching for court listings for: **{search_term}**")
 
-        # Setup Chrome WebDriver
+        # Served from the shared on-disk cache while fresh; otherwise a warm
+        # browser from the shared pool
+        refresh = st.button("Refresh from registry")
         try:
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+            with metrics.profiled('nsw-search'):
+                results, fetched, fresh = nsw_cache.search(search_term, backend, resources.driver_pool(), refresh=refresh)
         except Exception as e:
-            st.error(f"Error initializing Chrome WebDriver: {e}.  Ensure Chrome is installed correctly.")
-            driver = None # Set to None so the rest of the script doesn't attempt to use it.
-            results = None
-
-
-        if driver:
-            # Open the target URL
-            url = "https://onlineregistry.lawlink.nsw.gov.au/content/court-lists#/"
-
-            driver.get(url)
-
-            # Minimize browser window after opening
-            driver.minimize_window()
-
-            # Wait for page load
-            time.sleep(5)
-
-            # Find the search input and submit the term
-            search_box = driver.find_element(By.ID, "searchInput")
-            search_box.send_keys(search_term)
-            search_box.send_keys(Keys.RETURN)
-
-            # Wait for search results to load
-            time.sleep(6)
-
-            # Parse page source with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-
-            # Locate the result table
-            table = soup.find("table", class_="resultTable")
+            st.error(f"NSW search failed: {e}. Ensure Chrome is installed correctly.")
+            st.stop() # Stop execution if the search failed.
+        if results is None:
+            st.error("No resultTable found.")
             results = []
+        elif fresh:
+            st.caption(f"🟢 Fresh: fetched {nsw_cache.age(fetched)}")
+        else:
+            st.caption(f"🟠 Stale: fetched {nsw_cache.age(fetched)}; the registry could not be reached")
+        metrics.flush()
 
-            if table:
-                rows = table.find_all("tr")
-                for row in rows:
-                    cells = row.find_all(["td", "th"])
-                    cell_text = [cell.get_text(strip=True) for cell in cells]
-                    if cell_text:
-                        if REDACT_NAMES and len(cell_text) >= 4:
-                            cell_text[3] = redact_case_title(cell_text[3])
-                        results.append(cell_text)
-            else:
-                st.error("No resultTable found.")
-
-            # Close the browser after scraping
-            driver.quit()
-
-            # Define headers
-            headers = [
-                'Date', 'Time', 'Case Number', 'Case Title', 'Type', 'Court',
-                'Event', 'Presiding Officer', 'Location', 'Courtroom', 'Listing Number'
-            ]
-
-            # Display results in a more user-friendly format with coloured output
-            if results:
-                st.subheader(f"Court Listings for '{search_term}'")
-                for row in results:
-                    st.markdown(f'<span style="color:white">Date:</span> <span style="color:green">{row[0]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Time:</span> <span style="color:green">{row[1]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Case Number:</span> <span style="color:green">{row[2]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Case Title:</span> <span style="color:green">{row[3]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Type:</span> <span style="color:green">{row[4]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Court:</span> <span style="color:green">{row[5]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Event:</span> <span style="color:green">{row[6]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Presiding Officer:</span> <span style="color:green">{row[7]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Location:</span> <span style="color:green">{row[8]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Courtroom:</span> <span style="color:green">{row[9]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">Listing Number:</span> <span style="color:green">{row[10]}</span>', unsafe_allow_html=True)
-                    st.markdown(f'<span style="color:white">--------------------------</span>', unsafe_allow_html=True)
-
-                # Export options
-                st.subheader("Export Options")
-
-                # CSV Export
-                csv_filename = f"court_listings_{search_term.lower()}.csv"
-                if st.button("Download CSV", key="nsw_csv"):
-                    with open(csv_filename, mode="w", newline="", encoding="utf-utf8") as f:
-                        writer = csv.writer(f)
-                        writer.writerow(headers)
-                        writer.writerows(results)
-                    st.success(f"CSV exported to: {os.path.abspath(csv_filename)}")
-                    st.download_button(label="Download CSV", data=open(csv_filename, 'rb').read(), file_name=csv_filename, key="nsw_csv_download")
-
-                # Excel Export
-                excel_filename = f"court_listings_{search_term.lower()}.xlsx"
-                if st.button("Download Excel", key="nsw_excel"):
-                    wb = Workbook()
-                    ws = wb.active
-                    ws.title = "Court Listings"
-                    ws.append(headers)
-                    for row in results:
-                        ws.append(row)
-                    wb.save(excel_filename)
-                    st.success(f"Excel exported to: {os.path.abspath(excel_filename)}")
-                    st.download_button(label="Download Excel", data=open(excel_filename, 'rb').read(), file_name=excel_filename, key="nsw_excel_download")
+        # Define headers
+        headers = nsw_scraper.HEADERS
+
+        # Display results in a more user-friendly format with coloured output
+        if results:
+            st.subheader(f"Court Listings for '{search_term}'")
+            for row in results:
+                st.markdown(f'<span style="color:white">Date:</span> <span style="color:green">{row[0]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Time:</span> <span style="color:green">{row[1]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Case Number:</span> <span style="color:green">{row[2]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Case Title:</span> <span style="color:green">{row[3]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Type:</span> <span style="color:green">{row[4]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Court:</span> <span style="color:green">{row[5]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Event:</span> <span style="color:green">{row[6]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Presiding Officer:</span> <span style="color:green">{row[7]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Location:</span> <span style="color:green">{row[8]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Courtroom:</span> <span style="color:green">{row[9]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">Listing Number:</span> <span style="color:green">{row[10]}</span>', unsafe_allow_html=True)
+                st.markdown(f'<span style="color:white">--------------------------</span>', unsafe_allow_html=True)
+
+            # Export options: each file is built in memory only when its button is clicked
+            st.subheader("Export Options")
+            stem = f"court_listings_{search_term.lower()}"
+            for col, fmt in zip(st.columns(len(export.formats())), export.formats()):
+                mime, label = export.FORMATS[fmt]
+                col.download_button(
+                    label=f"Download {label}",
+                    data=functools.partial(export.to_bytes, fmt, headers, results),
+                    file_name=f"{stem}.{fmt}",
+                    mime=mime,
+                    key=f"nsw_{fmt}",
+                    on_click="ignore",
+                )
 
-            else:
-                st.warning(f"No results found for '{search_term}'.")
         else:
-            st.stop() # Stop execution if WebDriver failed.
+            st.warning(f"No results found for '{search_term}'.")
 
     else:
         st.info("Please enter a search term to get started.")
@@ -194,54 +134,49 @@ if region == "NSW":
 
 # --- QLD Functionality ---
 elif region == "QLD":
+    import name_index
+    import matched_pages
+    resources.warm()  # index refresh starts while the user is still typing
+    qld = resources.qld_search()  # the search service, when SEARCH_API_URL is set
     st.markdown("### QLD Court Listings Search")
     st.markdown("#### 🔍 Enter a name to scan across downloaded court PDFs")
     name = st.text_input("Name to search", placeholder="e.g. John Smith")
+    fuzzy = st.checkbox("Fuzzy match (spelling, word order, sound-alike surnames)")
+    threshold = st.slider("Similarity threshold", 0.5, 1.0, name_index.THRESHOLD, 0.05, disabled=not fuzzy)
 
-    @st.cache_data(show_spinner=False)
+    @st.cache_data(ttl=resources.REFRESH_SECONDS, show_spinner=False)
     def search_name(name, root='data'):
-        hits = []
-        for court in os.listdir(root):
-            court_path = os.path.join(root, court)
-            if not os.path.isdir(court_path):
-                continue
-            for file in os.listdir(court_path):
-                if file.endswith('.pdf'):
-                    file_path = os.path.join(court_path, file)
-                    try:
-                        with open(file_path, 'rb') as f:
-                            reader = PyPDF2.PdfReader(f)
-                            for i, page in enumerate(reader.pages):
-                                text = page.extract_text() or ""
-                                if name.lower() in text.lower():
-                                    hits.append((court, file, i + 1))
-                    except Exception as e:
-                        st.error(f"❌ Error reading {file_path}: {e}")
+        errors = []
+        hits = qld.search_pages(name, root, errors=errors)
+        for file_path, e in errors:
+            st.error(f"❌ Error reading {file_path}: {e}")
         return hits
 
-    def extract_pages(pdf_path, page_numbers):
-        output = PyPDF2.PdfWriter()
-        with open(pdf_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page_num in page_numbers:
-                try:
-                    output.add_page(reader.pages[page_num - 1])
-                except IndexError:
-                    st.warning(f"⚠️ Page {page_num} not found in {pdf_path}")
-        buffer = io.BytesIO()
-        output.write(buffer)
-        buffer.seek(0)
-        return buffer
-
-    def display_pdf_link(file_bytes, filename="preview.pdf"):
-        base64_pdf = base64.b64encode(file_bytes.read()).decode("utf-8")
-        href = f'<a href="data:application/pdf;base64,{base64_pdf}" target="_blank">📄 Open preview in new tab</a>'
-        st.markdown(href, unsafe_allow_html=True)
+    @st.cache_data(ttl=resources.REFRESH_SECONDS, show_spinner=False)
+    def listing_rows(name, root='data'):
+        grouped = {}
+        for row in qld.find_listings(name, root):
+            grouped.setdefault((row['court'], f"{row['date']}.pdf"), []).append(row)
+        return grouped
+
+    @st.cache_data(ttl=resources.REFRESH_SECONDS, show_spinner=False)
+    def fuzzy_rows(name, threshold, root='data'):
+        return qld.fuzzy_search(name, threshold, root)
 
     # -- Search logic
     if name:
-        with st.spinner("🕵️‍♂️ Searching... please wait."):
-            results = search_name(name)
+        # Opt-in profiling of slow queries (METRICS_PROFILE)
+        with st.spinner("🕵️‍♂️ Searching... please wait."), metrics.profiled('qld-search'):
+            resources.refresh_index()
+            if fuzzy:
+                matches = fuzzy_rows(name, threshold)
+                results = list(dict.fromkeys((row['court'], f"{row['date']}.pdf", row['page']) for row in matches))
+                rows = {}
+                for row in matches:
+                    rows.setdefault((row['court'], f"{row['date']}.pdf"), []).append(row)
+            else:
+                results = search_name(name)
+                rows = listing_rows(name)
 
         if results:
             st.success(f"✅ Found {name} in {len(results)} page(s):")
@@ -255,22 +190,90 @@ elif region == "QLD":
                 st.markdown("---")
                 st.markdown(f"#### 📂 {court} — {file}")
                 st.markdown(f"**🧾 Matching Pages:** {', '.join(map(str, pages))}")
+                for row in rows.get((court, file), []):
+                    score = f" · similarity `{row['score']:.2f}`" if 'score' in row else ""
+                    st.markdown(f"🕘 `{row['time']}` · Courtroom `{row['courtroom'] or '-'}` · {row['party']}{score}")
 
+                # The PDF is only built when the button is clicked, and is cached per (file, pages)
                 pdf_path = os.path.join('data', court, file)
-                combined_pdf = extract_pages(pdf_path, pages)
-
                 st.download_button(
                     label="⬇️ Download matched pages",
-                    data=combined_pdf,
+                    data=functools.partial(matched_pages.render, pdf_path, tuple(pages)),
                     file_name=f"{court}_{file.replace('.pdf', '')}_matches.pdf",
                     mime="application/pdf",
-                    key=f"{court}_{file}" # unique key
+                    key=f"{court}_{file}", # unique key
+                    on_click="ignore",
+                )
+                if st.button("📄 Preview matched pages", key=f"preview_{court}_{file}"):
+                    preview = matched_pages.publish(pdf_path, pages)
+                    st.markdown(f'<a href="{matched_pages.STATIC_URL}/{preview}" target="_blank">📄 Open preview in new tab</a>', unsafe_allow_html=True)
+
+            # Export the hit list itself (court, date, page) in any format
+            st.markdown("---")
+            hit_table = list(export.hit_rows(results))
+            for col, fmt in zip(st.columns(len(export.formats())), export.formats()):
+                mime, label = export.FORMATS[fmt]
+                col.download_button(
+                    label=f"⬇️ Hits as {label}",
+                    data=functools.partial(export.to_bytes, fmt, export.HIT_HEADERS, hit_table),
+                    file_name=f"qld_hits_{name.lower()}.{fmt}",
+                    mime=mime,
+                    key=f"qld_{fmt}",
+                    on_click="ignore",
                 )
-
-                combined_pdf.seek(0)
-                display_pdf_link(combined_pdf)
 
         else:
             st.warning(f"🚫 No matches found for {name}.")
+        metrics.flush()
+    else:
+        st.info("👈 Enter a name above to start searching.")
+
+
+# --- Both Regions At Once ---
+# The NSW registry and the QLD archive are searched concurrently; each
+# source's results appear as soon as it answers, so the page waits for the
+# slower of the two rather than both in turn
+elif region == "All regions":
+    import all_regions
+    resources.warm()
+    qld = resources.qld_search()
+    st.markdown("### NSW + QLD Court Listings Search")
+    term = st.text_input("Name to search", placeholder="e.g. Smith").strip()
+
+    if term:
+        placeholders = {source: st.empty() for source in all_regions.SOURCES}
+        for source, placeholder in placeholders.items():
+            placeholder.info(f"⏳ Searching {source}...")
+        icons = {'ok': '✅', 'partial': '🟠', 'timeout': '⏱️', 'error': '❌'}
+        records = []
+        with metrics.profiled('all-regions-search'):
+            for result in all_regions.search_all(term, driver_pool=resources.driver_pool(), qld=qld,
+                                                 prepare=resources.refresh_index):
+                source, found = result['source'], result['records']
+                records.extend(found)
+                with placeholders[source].container():
+                    note = f" · {result['note']}" if result['note'] else ""
+                    st.markdown(f"#### {icons[result['status']]} {source}: {len(found)} result(s) "
+                                f"in {result['seconds']:.1f}s{note}")
+                    if found:
+                        st.dataframe([dict(zip(all_regions.RECORD_HEADERS, r)) for r in found], hide_index=True)
+        metrics.flush()
+
+        if records:
+            # Both regions in one file, newest first
+            st.markdown("---")
+            combined = all_regions.sort_records(records)
+            for col, fmt in zip(st.columns(len(export.formats())), export.formats()):
+                mime, label = export.FORMATS[fmt]
+                col.download_button(
+                    label=f"⬇️ All results as {label}",
+                    data=functools.partial(export.to_bytes, fmt, all_regions.RECORD_HEADERS, combined),
+                    file_name=f"court_listings_all_{term.lower()}.{fmt}",
+                    mime=mime,
+                    key=f"all_{fmt}",
+                    on_click="ignore",
+                )
+        else:
+            st.warning(f"🚫 No results found for '{term}' in either region.")
     else:
-        st.info("👈 Enter a name above to start searching.")
\ No newline at end of file
+        st.info("👈 Enter a name above to search both regions.")
\ No newline at end of file
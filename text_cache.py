@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import metrics
+import extractors
+
+# Extracted page text lives here, outside data/ so the daily workflow never commits it
+CACHE_DIR = os.path.join('cache', 'text')
+
+
+def normalize(text):
+    """Casefold and collapse whitespace so searches are a plain substring test"""
+    return " ".join(text.casefold().split())
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def court_pdfs(root, court):
+    """The list file names in one court folder, loose or packed (see archive.py)"""
+    import archive
+    names = os.listdir(os.path.join(root, court))
+    files = [file for file in names if file.endswith('.pdf')]
+    if any(name.endswith(archive.INDEX_EXT) for name in names):
+        files = sorted(set(files).union(archive.packed_files(root, court)))
+    return files
+
+
+def iter_pdfs(root='data'):
+    """Yield (court, file) for every PDF in the data/<court>/<date>.pdf layout"""
+    for court in os.listdir(root):
+        court_path = os.path.join(root, court)
+        # Dot-folders hold scraper bookkeeping such as the object store
+        if court.startswith('.') or not os.path.isdir(court_path):
+            continue
+        for file in court_pdfs(root, court):
+            yield court, file
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, obj):
+    # Write to a temp file and rename so concurrent readers never see a partial entry
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _stamp_path(pdf_path, cache_dir):
+    key = hashlib.sha1(os.path.abspath(pdf_path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'stamps', key[:2], f"{key}.json")
+
+
+def _pages_path(digest, cache_dir):
+    return os.path.join(cache_dir, 'pages', digest[:2], f"{digest}.json")
+
+
+def _current(entry):
+    # Extracted with the extractor order in use now. Entries from before the
+    # order was recorded pass if every page came from the backend now first.
+    order = list(extractors.active_order())
+    if 'order' in entry:
+        return entry['order'] == order
+    return bool(order) and all(name == order[0] for name in entry.get('backends') or ['unrecorded'])
+
+
+def extract_text(pdf_path):
+    """Return the raw page texts of a PDF (see extractors.extract)"""
+    return extractors.extract(pdf_path)[0]
+
+
+def load_entry(pdf_path, cache_dir=CACHE_DIR):
+    """Return the cache entry for pdf_path, extracting it at most once.
+
+    A stamp keyed by the file path records its size, mtime and content hash.
+    The page text itself is stored by content hash, so an unchanged file is
+    never parsed again and identical files share one entry. The entry holds
+    'raw' and normalized 'pages' text lists, plus the extractor 'backends'
+    that produced each page, the 'seconds' each took and the extractor
+    'order' it was read with; an entry read with another order is extracted
+    again. Packed lists come with their text, which is read from the archive.
+    """
+    try:
+        st = os.stat(pdf_path)
+    except FileNotFoundError:
+        import archive
+        entry = archive.load_entry(pdf_path)
+        if entry is None:
+            raise
+        return entry
+    stamp_path = _stamp_path(pdf_path, cache_dir)
+    stamp = _read_json(stamp_path)
+    entry = None
+    if stamp and stamp.get('size') == st.st_size and stamp.get('mtime') == st.st_mtime_ns:
+        entry = _read_json(_pages_path(stamp['sha256'], cache_dir))
+        if entry is not None and not _current(entry):
+            entry = None
+
+    if entry is None:
+        digest = file_hash(pdf_path)
+        pages_path = _pages_path(digest, cache_dir)
+        entry = _read_json(pages_path)
+        if entry is None or not _current(entry):
+            raw_pages, backends, seconds = extractors.extract(pdf_path)
+            entry = {
+                'raw': raw_pages,
+                'pages': [normalize(p) for p in raw_pages],
+                'backends': backends,
+                'seconds': [round(s, 6) for s in seconds],
+                'order': list(extractors.active_order()),
+            }
+            _write_json(pages_path, entry)
+        _write_json(stamp_path, {
+            'path': pdf_path,
+            'size': st.st_size,
+            'mtime': st.st_mtime_ns,
+            'sha256': digest,
+        })
+
+    return entry
+
+
+def load_pages(pdf_path, cache_dir=CACHE_DIR, raw=False):
+    """Return the normalized (or raw) text of each page of pdf_path"""
+    entry = load_entry(pdf_path, cache_dir)
+    return entry['raw'] if raw else entry['pages']
+
+
+def _load_batch(paths, cache_dir):
+    # Runs in a worker process. Exceptions are flattened to RuntimeError so
+    # they always survive the trip back to the parent.
+    failed = []
+    for path in paths:
+        try:
+            load_pages(path, cache_dir)
+        except Exception as e:
+            failed.append((path, RuntimeError(str(e))))
+    return failed
+
+
+def _load_batch_worker(paths, cache_dir):
+    # A forked worker starts with a copy of the parent's metrics, so count
+    # from zero and send back only what this batch observed
+    metrics.REGISTRY.reset()
+    return _load_batch(paths, cache_dir), metrics.REGISTRY.snapshot()
+
+
+def load_many(paths, workers=1, cache_dir=CACHE_DIR, errors=None):
+    """Make sure every PDF in paths is in the cache, using a process pool.
+
+    Work is chunked by court directory and the biggest courts are submitted
+    first. Returns the set of paths that failed; failures are appended to
+    errors as (path, exception) when a list is given, otherwise printed.
+    """
+    batches = {}
+    for path in paths:
+        batches.setdefault(os.path.dirname(path), []).append(path)
+
+    failed = []
+    if workers == 1 or len(batches) <= 1:
+        for batch in batches.values():
+            failed.extend(_load_batch(batch, cache_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_load_batch_worker, batch, cache_dir)
+                for batch in sorted(batches.values(), key=len, reverse=True)
+            ]
+            for future in as_completed(futures):
+                batch_failed, snapshot = future.result()
+                failed.extend(batch_failed)
+                metrics.REGISTRY.merge(snapshot)
+
+    for path, e in failed:
+        if errors is None:
+            print(f"Error reading {os.path.basename(path)}: {e}")
+        else:
+            errors.append((path, e))
+    return {path for path, _ in failed}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract the text of every downloaded PDF into the cache")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: one per core)")
+    parser.add_argument('--stats', action='store_true', help="summarize which extractor produced the cached pages, and how fast")
+    args = parser.parse_args()
+
+    if args.stats:
+        # backend -> [pages, seconds]; entries cached before backends were
+        # recorded came from PyPDF2 but have no timings
+        totals = {}
+        for dirpath, _, files in os.walk(os.path.join(CACHE_DIR, 'pages')):
+            for file in files:
+                entry = _read_json(os.path.join(dirpath, file)) or {}
+                backends = entry.get('backends') or ['unrecorded'] * len(entry.get('pages', []))
+                seconds = entry.get('seconds') or [None] * len(backends)
+                for name, s in zip(backends, seconds):
+                    total = totals.setdefault(name, [0, 0.0])
+                    total[0] += 1
+                    total[1] += s or 0.0
+        for name, (pages, seconds) in sorted(totals.items()):
+            speed = f", {seconds / pages * 1000:.1f} ms/page" if name != 'unrecorded' else ""
+            print(f"{name:12} {pages:7} page(s){speed}")
+        raise SystemExit
+
+    paths = [os.path.join(args.root, court, file) for court, file in iter_pdfs(args.root)]
+    start = time.perf_counter()
+    failed = load_many(paths, workers=args.workers)
+    print(f"✅ Extracted {len(paths) - len(failed)} of {len(paths)} file(s) in {time.perf_counter() - start:.1f}s")
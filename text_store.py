@@ -0,0 +1,305 @@
+import os
+import re
+import json
+import mmap
+import bisect
+import threading
+import archive
+from manifest import iter_pdfs, in_range
+from text_cache import load_pages, normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in one process are kept apart
+    fcntl = None
+
+# Every list's normalized page text in one flat file, for scans that can't use
+# the full-text index (no index yet, regular expressions). text.bin holds the
+# pages back to back as UTF-8, each ending in a newline (normalized text has
+# none, so a match never runs across pages); offsets.bin holds each page's
+# start as an int64; meta.json lists the files in order with the first page
+# each starts at. Both are memory-mapped and searched in place with
+# mmap.find / bytes regexes, so a scan of the whole archive copies nothing
+# and its memory use doesn't grow with the archive.
+#
+# The store is append-only: new lists go on the end and meta.json, written
+# last, commits them. meta.json keeps each list's size and mtime; a changed
+# or removed list means a rebuild. Each root has its own store.
+STORE_DIR = os.path.join('cache', 'store')
+VERSION = 1
+
+_lock = threading.Lock()
+
+
+def store_dir_for(root='data'):
+    """The store for lists under root: STORE_DIR for data/, otherwise a
+    dot-folder inside root, which the court walk skips"""
+    if os.path.abspath(root) == os.path.abspath('data'):
+        return STORE_DIR
+    return os.path.join(root, '.store')
+
+
+def _paths(store_dir, generation):
+    return (os.path.join(store_dir, f'text-{generation}.bin'),
+            os.path.join(store_dir, f'offsets-{generation}.bin'))
+
+
+def _meta_path(store_dir):
+    return os.path.join(store_dir, 'meta.json')
+
+
+def read_meta(store_dir=STORE_DIR):
+    try:
+        with open(_meta_path(store_dir), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == VERSION else None
+
+
+def _empty(generation=0):
+    return {'version': VERSION, 'generation': generation, 'files': [], 'pages': 0, 'bytes': 0, 'sorted': True}
+
+
+def update(root='data', store_dir=None, errors=None):
+    """Append lists that aren't in the store yet; rebuild if any stored list
+    changed or disappeared. Returns the number of lists added.
+
+    store_dir defaults to root's own store (see store_dir_for).
+
+    Text comes from the text cache, so lists are extracted at most once.
+    Unreadable files are appended to errors as (path, exception) when a list
+    is given, otherwise printed, and left out until the next update.
+    """
+    store_dir = store_dir or store_dir_for(root)
+    os.makedirs(store_dir, exist_ok=True)
+    with _lock, open(os.path.join(store_dir, 'lock'), 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        stamps = {}
+        for court, file in iter_pdfs(root):
+            try:
+                stamps[(court, file)] = list(archive.stat(os.path.join(root, court, file)))
+            except OSError:
+                continue
+        meta = old = read_meta(store_dir)
+        if meta is None:
+            meta = _empty()
+        elif any(stamps.get((court, file)) != [size, mtime] for court, file, size, mtime, _ in meta['files']):
+            # Rebuilt into new files: open readers keep mapping the old ones
+            meta = _empty(meta['generation'] + 1)
+        stored = {(court, file) for court, file, *_ in meta['files']}
+        # Oldest first, so the store reads newest last
+        new = sorted((key for key in stamps if key not in stored), key=lambda cf: (cf[1], cf[0]))
+        if not new and meta is old:
+            return 0
+
+        last = meta['files'][-1][1] if meta['files'] else ''
+        added = 0
+        mode = 'r+b' if meta['files'] else 'w+b'
+        text_path, offsets_path = _paths(store_dir, meta['generation'])
+        with open(text_path, mode) as text, open(offsets_path, mode) as offsets:
+            # Drop anything an interrupted update wrote past the committed end
+            text.truncate(meta['bytes'])
+            offsets.truncate(meta['pages'] * 8)
+            text.seek(meta['bytes'])
+            offsets.seek(meta['pages'] * 8)
+            for court, file in new:
+                path = os.path.join(root, court, file)
+                try:
+                    pages = load_pages(path)
+                except Exception as e:
+                    if errors is None:
+                        print(f"Error reading {file}: {e}")
+                    else:
+                        errors.append((path, e))
+                    continue
+                meta['files'].append([court, file, *stamps[(court, file)], meta['pages']])
+                meta['sorted'] = meta['sorted'] and file >= last
+                last = file
+                for page in pages:
+                    data = page.encode('utf-8') + b'\n'
+                    offsets.write(meta['bytes'].to_bytes(8, 'little', signed=True))
+                    text.write(data)
+                    meta['bytes'] += len(data)
+                    meta['pages'] += 1
+                added += 1
+            text.flush()
+            offsets.flush()
+            os.fsync(text.fileno())
+            os.fsync(offsets.fileno())
+        meta_path = _meta_path(store_dir)
+        with open(meta_path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.part', meta_path)
+        if old and old['generation'] != meta['generation']:
+            for path in _paths(store_dir, old['generation']):
+                os.remove(path)
+        return added
+
+
+class TextStore:
+    """A read-only view of the store as of when it was opened (or reopen()ed)"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self._maps = []
+        self.reopen()
+
+    def reopen(self):
+        """Pick up lists committed since the store was opened"""
+        self.close()
+        meta = read_meta(self.store_dir) or _empty()
+        self.files = [tuple(f[:2]) for f in meta['files']]
+        self.stamps = {tuple(f[:2]): f[2:4] for f in meta['files']}
+        self.first_pages = [f[4] for f in meta['files']]
+        self.sorted = meta['sorted']
+        self.size = meta['bytes']
+        self.pages = meta['pages']
+        self.text = self.offsets = self._days = None
+        if self.pages:
+            text_path, offsets_path = _paths(self.store_dir, meta['generation'])
+            with open(text_path, 'rb') as t, open(offsets_path, 'rb') as o:
+                self.text = mmap.mmap(t.fileno(), self.size, access=mmap.ACCESS_READ)
+                offsets = mmap.mmap(o.fileno(), self.pages * 8, access=mmap.ACCESS_READ)
+            view = memoryview(offsets)
+            self.offsets = view.cast('q')
+            self._maps = [self.offsets, view, offsets, self.text]
+
+    def close(self):
+        for m in getattr(self, '_maps', []):
+            m.release() if isinstance(m, memoryview) else m.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def covers(self, files, root='data'):
+        """Whether every (court, file) in files is in the store as it is
+        under root now: same size and mtime as when it was stored"""
+        for court, file in files:
+            stamp = self.stamps.get((court, file))
+            try:
+                if stamp is None or list(archive.stat(os.path.join(root, court, file))) != stamp:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _locate(self, pos):
+        # Byte position -> (page index, file index)
+        page = bisect.bisect_right(self.offsets, pos) - 1
+        return page, bisect.bisect_right(self.first_pages, page) - 1
+
+    def _offset(self, page):
+        # Where page starts; the end of the text for one past the last page
+        return self.offsets[page] if page < self.pages else self.size
+
+    def _file_span(self, index):
+        # Byte range of every page of file index
+        end = self._offset(self.first_pages[index + 1]) if index + 1 < len(self.files) else self.size
+        return self._offset(self.first_pages[index]), end
+
+    def _wanted(self, courts, since, until):
+        if courts is None and not since and not until:
+            return None
+        courts = set(courts) if courts is not None else None
+        return [(courts is None or court in courts) and in_range(file, since, until) for court, file in self.files]
+
+    def _spans(self, newest_first):
+        # Byte ranges to scan in order: the whole text, or (when the store is
+        # in date order) each day's lists, latest day first
+        if not newest_first:
+            return [(0, self.size)]
+        if self._days is not None:
+            return self._days
+        days = []
+        for index, (_, file) in enumerate(self.files):
+            if days and days[-1][0] == file:
+                days[-1][2] = index + 1
+            else:
+                days.append([file, index, index + 1])
+        self._days = [(self._file_span(first)[0], self._file_span(last - 1)[1]) for _, first, last in reversed(days)]
+        return self._days
+
+    def _iter(self, find, wanted, spans):
+        # find(start, end) -> match start or -1; each page, and each unwanted
+        # file, is skipped as soon as it is found
+        for start, end in spans:
+            while start < end:
+                pos = find(start, end)
+                if pos < 0:
+                    break
+                page, index = self._locate(pos)
+                if wanted is not None and not wanted[index]:
+                    start = self._file_span(index)[1]
+                    continue
+                court, file = self.files[index]
+                yield court, file, page - self.first_pages[index] + 1
+                start = self._offset(page + 1)
+
+    def _search(self, find, newest_first, courts, since, until):
+        ordered = newest_first and self.sorted
+        hits = self._iter(find, self._wanted(courts, since, until), self._spans(ordered))
+        return _newest_first(hits) if newest_first and not ordered else hits
+
+    def find(self, name, newest_first=False, courts=None, since=None, until=None):
+        """Yield (court, file, page) for every page containing name.
+
+        Pages come in store order (oldest list first), or newest first like
+        the index: date descending, then court and page. courts and the
+        inclusive YYYY-MM-DD since/until dates skip other lists.
+        """
+        needle = normalize(name).encode('utf-8')
+        if not needle or not self.pages:
+            return
+        yield from self._search(lambda start, end: self.text.find(needle, start, end),
+                                newest_first, courts, since, until)
+
+    def match(self, pattern, newest_first=False, courts=None, since=None, until=None):
+        """Like find, for a regular expression over the normalized (casefolded,
+        single-spaced) page text; ^ and $ match at the start and end of a
+        page. Raises re.error for a bad pattern."""
+        if not self.pages:
+            return
+        regex = re.compile(pattern.encode('utf-8'), re.MULTILINE)
+
+        def find(start, end):
+            m = regex.search(self.text, start, end)
+            return m.start() if m else -1
+        yield from self._search(find, newest_first, courts, since, until)
+
+
+def _newest_first(hits):
+    # The index's order: date descending, then court and page
+    hits = sorted(hits, key=lambda hit: (hit[0], hit[2]))
+    hits.sort(key=lambda hit: hit[1], reverse=True)
+    return hits
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Bring the flat text store up to date, or scan it")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--find', metavar='TEXT', help="list the pages containing TEXT")
+    parser.add_argument('--regex', metavar='PATTERN', help="list the pages matching PATTERN")
+    args = parser.parse_args()
+
+    store_dir = store_dir_for(args.root)
+    if args.find or args.regex:
+        with TextStore(store_dir) as store:
+            start = time.perf_counter()
+            hits = list(store.find(args.find) if args.find else store.match(args.regex))
+            for court, file, page in hits:
+                print(f"{court}/{file} p.{page}")
+            print(f"🔎 {len(hits)} page(s) of {store.pages} in {time.perf_counter() - start:.3f}s")
+    else:
+        start = time.perf_counter()
+        n = update(args.root)
+        meta = read_meta(store_dir)
+        print(f"✅ Added {n} list(s) to {store_dir}: {len(meta['files'])} list(s), {meta['pages']} page(s), "
+              f"{meta['bytes'] / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
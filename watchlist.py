@@ -0,0 +1,163 @@
+import os
+import csv
+import sys
+import json
+from collections import deque
+from manifest import iter_pdfs
+from text_cache import load_pages, normalize
+
+
+class Automaton:
+    """Aho-Corasick automaton over normalized patterns.
+
+    Each text is scanned once, one character at a time, however many
+    patterns there are. Matches are plain substrings, like search.py.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.patterns = []
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append(index)
+
+    def _link(self):
+        # Breadth-first so every fail target is finished before it is used
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, text):
+        """Return the set of pattern indexes that occur in text"""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def patterns_for(name):
+    """Normalized search strings for one watchlist entry.
+
+    Law lists print "Surname, Given Names", so "John Smith" is also looked for
+    as "smith, john".
+    """
+    norm = normalize(name)
+    patterns = {norm}
+    words = norm.split()
+    if ',' not in norm and len(words) >= 2:
+        patterns.add(f"{words[-1]}, {' '.join(words[:-1])}")
+    return patterns
+
+
+def load_names(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def build(names):
+    """Return (automaton, owners) where owners[i] lists the names pattern i came from"""
+    by_pattern = {}
+    for name in names:
+        for pattern in patterns_for(name):
+            by_pattern.setdefault(pattern, []).append(name)
+    patterns = sorted(by_pattern)
+    return Automaton(patterns), [by_pattern[p] for p in patterns]
+
+
+def scan(names, root='data', date=None, files=None, errors=None):
+    """Yield (name, court, date, page) for every watchlist name on every page.
+
+    Scans every PDF under root, or only those dated date, or only files
+    (a list of (court, file) pairs). Each page's text is scanned once for the
+    whole watchlist. Unreadable files are appended to errors as
+    (path, exception) when a list is given, otherwise printed.
+    """
+    automaton, owners = build(names)
+    if files is None:
+        files = [(court, file) for court, file in iter_pdfs(root)
+                 if date is None or file == f"{date}.pdf"]
+    for court, file in sorted(files):
+        path = os.path.join(root, court, file)
+        try:
+            pages = load_pages(path)
+        except Exception as e:
+            if errors is None:
+                print(f"Error reading {file}: {e}", file=sys.stderr)
+            else:
+                errors.append((path, e))
+            continue
+        for page, text in enumerate(pages, start=1):
+            matched = set()
+            for index in automaton.search(text):
+                matched.update(owners[index])
+            for name in sorted(matched):
+                yield name, court, file[:-len('.pdf')], page
+
+
+FIELDS = ['name', 'court', 'date', 'page']
+
+
+def write_hits(hits, out, fmt='csv'):
+    """Write hits to the open file out as CSV or JSONL. Returns the number written."""
+    count = 0
+    writer = csv.writer(out) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(FIELDS)
+    for hit in hits:
+        if writer:
+            writer.writerow(hit)
+        else:
+            out.write(json.dumps(dict(zip(FIELDS, hit))) + "\n")
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Check a watchlist of names against the law lists in one pass")
+    parser.add_argument('names', help="text file with one name per line")
+    parser.add_argument('--root', default='data')
+    parser.add_argument('--date', help="only scan lists dated YYYY-MM-DD (e.g. today's download)")
+    parser.add_argument('--out', help="write hits here instead of stdout")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="default: from --out extension, else csv")
+    args = parser.parse_args()
+
+    fmt = args.format or ('jsonl' if args.out and args.out.endswith('.jsonl') else 'csv')
+    hits = scan(load_names(args.names), args.root, args.date)
+    if args.out:
+        with open(args.out, 'w', newline='', encoding='utf-8') as f:
+            n = write_hits(hits, f, fmt)
+        print(f"✅ {n} hit(s) written to {args.out}")
+    else:
+        write_hits(hits, sys.stdout, fmt)